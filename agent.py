@@ -1,8 +1,18 @@
-from langchain_openai import ChatOpenAI
-from browser_use import Agent, Controller
-import asyncio, time, json, os
+import asyncio, time, os
+import functools, string
+import httpx
+import orjson
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
-from config import *
+from config import (
+    CACHE_SETTINGS,
+    DEFAULT_COMPANY,
+    DEFAULT_RESEARCH_TYPE,
+    OUTPUT_SETTINGS,
+    RESEARCH_TYPES,
+    lookup_industry
+)
+from llm_cache import PromptCache
 
 load_dotenv()
 
@@ -111,20 +121,114 @@ Provide a structured risk assessment with:
 - Suggested monitoring requirements
 """
 
-async def save_research_result(result, research_type, company_name):
-    """Save research results to structured files"""
-    timestamp = int(time.time())
+# Research type -> prompt template, with placeholders compiled once at import
+PROMPT_TEMPLATES = {
+    research_type: string.Template(
+        prompt.replace("[Company Name]", "$company").replace("[Industry Name]", "$industry")
+    )
+    for research_type, prompt in {
+        "financial": company_financial_snapshot_prompt,
+        "news": company_news_sentiment_prompt,
+        "industry": industry_overview_prompt,
+        "sec": sec_filing_prompt,
+        "credit": credit_health_prompt,
+        "competitive": competitive_analysis_prompt,
+        "management": management_assessment_prompt,
+        "comprehensive": comprehensive_risk_assessment_prompt
+    }.items()
+}
+
+@functools.lru_cache(maxsize=512)
+def render_prompt(research_type, company_name, industry="general"):
+    """Render the prompt for a research type and company (cached per combination)"""
+    return PROMPT_TEMPLATES[research_type].substitute(company=company_name, industry=industry)
+
+def create_llm(max_connections=10):
+    """Create a ChatOpenAI client backed by one pooled keep-alive HTTP client"""
+    # Deferred: langchain's import graph is slow and heavy
+    from langchain_openai import ChatOpenAI
     
-    # Try to parse as JSON, if not, save as text
-    try:
-        parsed_result = json.loads(result)
-        filename = f"lending_research_{company_name}_{research_type}_{timestamp}.json"
-        with open(filename, "w") as f:
-            json.dump(parsed_result, f, indent=4)
-    except json.JSONDecodeError:
-        filename = f"lending_research_{company_name}_{research_type}_{timestamp}.txt"
-        with open(filename, "w") as f:
-            f.write(result)
+    http_async_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        )
+    )
+    return ChatOpenAI(model="gpt-4o", http_async_client=http_async_client)
+
+async def close_llm(llm):
+    """Close the pooled HTTP client owned by an LLM from create_llm"""
+    if llm.http_async_client is not None:
+        await llm.http_async_client.aclose()
+
+# Shared OpenAI client for prompts that don't need a browser agent
+_raw_llm = None
+
+def get_raw_llm():
+    """Return the process-wide AsyncOpenAI client, creating it on first use"""
+    global _raw_llm
+    if _raw_llm is None:
+        _raw_llm = AsyncOpenAI()
+    return _raw_llm
+
+async def chat(prompt, model="gpt-4o"):
+    """Send a single prompt straight to the chat completions API"""
+    response = await get_raw_llm().chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    return response.choices[0].message.content
+
+def create_prompt_cache():
+    """Create the shared prompt cache, or None when caching is disabled"""
+    if not CACHE_SETTINGS["enabled"]:
+        return None
+    return PromptCache(
+        path=CACHE_SETTINGS["path"],
+        similarity_threshold=CACHE_SETTINGS["similarity_threshold"]
+    )
+
+def cache_scope(research_type, company_name):
+    """Prompt cache scope for one company's research, so a lookup never returns another company's result"""
+    return f"{research_type}:{company_name}"
+
+def cache_ttl(research_type):
+    """Return how long a cached result for research_type stays valid"""
+    if research_type in CACHE_SETTINGS["time_sensitive_research_types"]:
+        return CACHE_SETTINGS["time_sensitive_ttl_seconds"]
+    return CACHE_SETTINGS["ttl_seconds"]
+
+def _write_file(filename, data):
+    with open(filename, "wb") as f:
+        f.write(data)
+
+async def save_research_result(result, research_type, company_name, output_dir=None, is_json=None):
+    """Save research results to structured files
+    
+    With output_dir, results go to <output_dir>/<company>_<research_type>.<ext>
+    instead of a timestamped file in the working directory. Pass is_json when
+    the caller already knows the result format to skip the trial JSON parse.
+    """
+    if is_json is None:
+        # Try to parse as JSON, if not, save as text
+        try:
+            data = orjson.dumps(orjson.loads(result), option=orjson.OPT_INDENT_2)
+            is_json = True
+        except orjson.JSONDecodeError:
+            data = str(result).encode()
+            is_json = False
+    else:
+        data = str(result).encode()
+    
+    extension = "json" if is_json else "txt"
+    if output_dir is not None:
+        filename = os.path.join(output_dir, f"{company_name}_{research_type}.{extension}")
+    else:
+        timestamp = int(time.time())
+        filename = f"lending_research_{company_name}_{research_type}_{timestamp}.{extension}"
+    
+    # Write in a worker thread so concurrent agents aren't blocked on disk I/O
+    await asyncio.get_running_loop().run_in_executor(None, _write_file, filename, data)
     
     print(f"Research complete. Results saved to: {filename}")
     return filename
@@ -135,35 +239,41 @@ async def main():
     RESEARCH_TYPE = DEFAULT_RESEARCH_TYPE  # Change this in config.py
     
     # Get industry for the company
-    company_industry = INDUSTRY_MAPPINGS.get(COMPANY_NAME, "general")
-    
-    # Map research types to prompts
-    research_prompts = {
-        "financial": company_financial_snapshot_prompt.replace("[Company Name]", COMPANY_NAME),
-        "news": company_news_sentiment_prompt.replace("[Company Name]", COMPANY_NAME),
-        "industry": industry_overview_prompt.replace("[Industry Name]", company_industry),
-        "sec": sec_filing_prompt.replace("[Company Name]", COMPANY_NAME),
-        "credit": credit_health_prompt.replace("[Company Name]", COMPANY_NAME),
-        "competitive": competitive_analysis_prompt.replace("[Company Name]", COMPANY_NAME),
-        "management": management_assessment_prompt.replace("[Company Name]", COMPANY_NAME),
-        "comprehensive": comprehensive_risk_assessment_prompt.replace("[Company Name]", COMPANY_NAME)
-    }
+    company_industry = lookup_industry(COMPANY_NAME)
     
     # Select the appropriate prompt
-    selected_prompt = research_prompts.get(RESEARCH_TYPE, comprehensive_risk_assessment_prompt.replace("[Company Name]", COMPANY_NAME))
+    prompt_type = RESEARCH_TYPE if RESEARCH_TYPE in PROMPT_TEMPLATES else "comprehensive"
+    selected_prompt = render_prompt(prompt_type, COMPANY_NAME, company_industry)
     
     print(f"Starting {RESEARCH_TYPES.get(RESEARCH_TYPE, RESEARCH_TYPE)} research for {COMPANY_NAME}...")
     print("=" * 50)
     
     # Initialize and run the agent
-    llm = ChatOpenAI(model="gpt-4o")
-    agent = Agent(
-        task=selected_prompt,
-        llm=llm
-    )
+    llm = create_llm()
+    prompt_cache = create_prompt_cache()
     
     try:
-        result = await agent.run()
+        result = None
+        if prompt_cache:
+            result = await prompt_cache.get(
+                selected_prompt,
+                ttl=cache_ttl(RESEARCH_TYPE),
+                scope=cache_scope(RESEARCH_TYPE, COMPANY_NAME)
+            )
+            if result is not None:
+                print("Using cached research result")
+        
+        if result is None:
+            from browser_use import Agent
+            
+            agent = Agent(
+                task=selected_prompt,
+                llm=llm
+            )
+            result = await agent.run()
+            if prompt_cache:
+                await prompt_cache.put(selected_prompt, str(result), scope=cache_scope(RESEARCH_TYPE, COMPANY_NAME))
+        
         print("\n" + "=" * 50)
         print("RESEARCH RESULTS:")
         print("=" * 50)
@@ -176,6 +286,10 @@ async def main():
     except Exception as e:
         print(f"Error during research: {e}")
         print("Please check your internet connection and try again.")
+    finally:
+        await close_llm(llm)
+        if prompt_cache:
+            prompt_cache.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
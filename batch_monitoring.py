@@ -9,8 +9,14 @@ for lending analysis.
 import asyncio
 import json
 import csv
+import re
+import orjson
+import pandas as pd
 from datetime import datetime
-from monitoring_agent import CompanyMonitoringAgent
+from monitoring_agent import MONITORING_TIMEOUT, CompanyMonitoringAgent, configure_logging
+from llm_cache import PromptCache
+from rate_limiter import AsyncRateLimiter
+from config import CACHE_SETTINGS, SCRAPING_SETTINGS
 
 # Sample companies to monitor
 SAMPLE_COMPANIES = [
@@ -46,10 +52,57 @@ SAMPLE_COMPANIES = [
     }
 ]
 
+# Fixed CSV schema so rows can be streamed before all results are known
+CSV_FIELDNAMES = [
+    'Company Name',
+    'Industry',
+    'Location',
+    'Monitoring Date',
+    'Has Positive Indicators',
+    'Has Negative Indicators',
+    'Has Risk Factors',
+    'Status',
+    'Error'
+]
+
+# A comprehensive monitoring run makes one combined analysis call (up to
+# ~7000 tokens of page content) plus a summary call over the report
+REQUESTS_PER_COMPANY = 2
+TOKENS_PER_COMPANY = 12000
+
+# Per-company budget: the source crawls (capped at MONITORING_TIMEOUT, with
+# their own retries) plus the analysis and summary calls
+COMPANY_TIMEOUT = MONITORING_TIMEOUT + 120
+
+# One case-insensitive pass finds all three indicator keywords
+SENTIMENT_PATTERN = re.compile(r"(positive)|(negative)|(risk)", re.IGNORECASE)
+
 class BatchMonitoringAgent:
     def __init__(self):
         self.agent = CompanyMonitoringAgent()
         self.results = []
+        self.jsonl_path = None
+        self.csv_path = None
+        self._jsonl = None
+        self._csv_file = None
+        self._csv_writer = None
+        self.prompt_cache = None
+        if CACHE_SETTINGS["enabled"]:
+            self.prompt_cache = PromptCache(
+                path=CACHE_SETTINGS["path"],
+                similarity_threshold=CACHE_SETTINGS["similarity_threshold"]
+            )
+    
+    async def _run_monitoring(self, company_info):
+        """Run comprehensive monitoring within the per-company time budget"""
+        return await asyncio.wait_for(
+            self.agent.comprehensive_monitoring(
+                company_name=company_info['name'],
+                location=company_info['location'],
+                website_url=company_info['website']
+            ),
+            timeout=COMPANY_TIMEOUT
+        )
     
     async def monitor_company(self, company_info):
         """Monitor a single company"""
@@ -59,21 +112,34 @@ class BatchMonitoringAgent:
         print(f"Location: {company_info['location']}")
         print(f"{'='*60}")
         
+        cache_key = (
+            f"Comprehensive monitoring of {company_info['name']} "
+            f"in {company_info['location']} ({company_info['website']})"
+        )
+        # Only reports for this company can answer the lookup
+        cache_scope = f"monitoring:{company_info['name']}"
+        
         try:
-            # Run comprehensive monitoring
-            report = await self.agent.comprehensive_monitoring(
-                company_name=company_info['name'],
-                location=company_info['location'],
-                website_url=company_info['website']
-            )
+            cached = None
+            if self.prompt_cache:
+                cached = await self.prompt_cache.get(
+                    cache_key, ttl=CACHE_SETTINGS["time_sensitive_ttl_seconds"], scope=cache_scope
+                )
+            
+            if cached is not None:
+                print(f"Using cached monitoring report for {company_info['name']}")
+                report = json.loads(cached)
+            else:
+                # Run comprehensive monitoring
+                report = await self._run_monitoring(company_info)
+                if self.prompt_cache:
+                    # Failed sources may hold exception objects; store them as text
+                    await self.prompt_cache.put(cache_key, json.dumps(report, default=str), scope=cache_scope)
             
             # Add company info to report
             report['company_info'] = company_info
             report['monitoring_status'] = 'success'
             
-            # Save individual report
-            self.agent.save_monitoring_report(report, company_info['name'])
-            
             return report
             
         except Exception as e:
@@ -86,30 +152,77 @@ class BatchMonitoringAgent:
                 'monitoring_date': datetime.now().isoformat()
             }
     
+    def _open_streams(self):
+        """Open the JSONL and CSV files that results are streamed into"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.jsonl_path = f"batch_monitoring_results_{timestamp}.jsonl"
+        self.csv_path = f"monitoring_summary_{timestamp}.csv"
+        
+        self._jsonl = open(self.jsonl_path, 'wb')
+        self._csv_file = open(self.csv_path, 'w', newline='')
+        self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=CSV_FIELDNAMES)
+        self._csv_writer.writeheader()
+    
+    def _close_streams(self):
+        """Close the streamed result files"""
+        if self._jsonl:
+            self._jsonl.close()
+            self._jsonl = None
+        if self._csv_file:
+            self._csv_file.close()
+            self._csv_file = None
+            self._csv_writer = None
+    
+    def _write_result(self, result):
+        """Append one result to the streamed JSONL and CSV files"""
+        self._jsonl.write(orjson.dumps(result, default=str, option=orjson.OPT_APPEND_NEWLINE))
+        self._jsonl.flush()
+        self._csv_writer.writerow(self._csv_row(result))
+        self._csv_file.flush()
+    
     async def monitor_companies(self, companies):
         """Monitor multiple companies"""
         print(f"Starting batch monitoring for {len(companies)} companies...")
         
-        # Monitor companies concurrently (with rate limiting)
-        semaphore = asyncio.Semaphore(3)  # Limit to 3 concurrent requests
+        # Monitor companies concurrently, paced to the provider's rate limits
+        semaphore = asyncio.Semaphore(SCRAPING_SETTINGS["max_concurrency"])
+        limiter = AsyncRateLimiter(
+            SCRAPING_SETTINGS["requests_per_minute"],
+            SCRAPING_SETTINGS["tokens_per_minute"]
+        )
         
         async def monitored_company(company):
             async with semaphore:
+                await limiter.acquire(TOKENS_PER_COMPANY, REQUESTS_PER_COMPANY)
                 return await self.monitor_company(company)
         
-        # Run monitoring tasks
-        tasks = [monitored_company(company) for company in companies]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Process results
-        for result in results:
-            if isinstance(result, Exception):
-                print(f"Exception in monitoring: {result}")
-            else:
+        self._open_streams()
+        try:
+            # Run monitoring tasks, handling each result as soon as it lands
+            tasks = [monitored_company(company) for company in companies]
+            for next_result in asyncio.as_completed(tasks):
+                try:
+                    result = await next_result
+                except Exception as e:
+                    print(f"Exception in monitoring: {e}")
+                    continue
+                
                 self.results.append(result)
+                self._write_result(result)
+                if result.get('monitoring_status') == 'success':
+                    # Save individual report
+                    self.agent.save_monitoring_report(result, result['company_name'])
+        finally:
+            self._close_streams()
         
         return self.results
     
+    async def aclose(self):
+        """Release the monitoring agent's HTTP session and the prompt cache"""
+        await self.agent.aclose()
+        if self.prompt_cache is not None:
+            self.prompt_cache.close()
+    
     def generate_summary_report(self):
         """Generate a summary report of all monitoring results"""
         if not self.results:
@@ -144,75 +257,111 @@ class BatchMonitoringAgent:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"batch_monitoring_report_{timestamp}.json"
         
-        batch_report = {
-            "summary": self.generate_summary_report(),
-            "detailed_results": self.results
-        }
+        summary = orjson.dumps(self.generate_summary_report(), default=str)
         
-        with open(filename, 'w') as f:
-            json.dump(batch_report, f, indent=2)
+        with open(filename, 'wb') as f:
+            f.write(b'{"summary":' + summary + b',"detailed_results":[')
+            if self.jsonl_path:
+                # Copy the streamed results instead of re-serializing them
+                with open(self.jsonl_path, 'rb') as results_file:
+                    for i, line in enumerate(results_file):
+                        if i:
+                            f.write(b',')
+                        f.write(line.rstrip(b'\n'))
+            else:
+                f.write(b','.join(orjson.dumps(r, default=str) for r in self.results))
+            f.write(b']}')
         
         print(f"\nBatch monitoring report saved to: {filename}")
         return filename
     
+    def _csv_row(self, result):
+        """Build the CSV summary row for one monitoring result"""
+        company_info = result.get('company_info', {})
+        row = {
+            'Company Name': result.get('company_name', ''),
+            'Industry': company_info.get('industry', ''),
+            'Location': company_info.get('location', ''),
+            'Monitoring Date': result.get('monitoring_date', '')
+        }
+        
+        if result.get('monitoring_status') == 'success':
+            # Extract key metrics from summary analysis
+            summary = result.get('summary_analysis', '')
+            
+            # Simple extraction of key metrics (you can enhance this)
+            flags = [False, False, False]
+            for match in SENTIMENT_PATTERN.finditer(summary):
+                flags[match.lastindex - 1] = True
+                if all(flags):
+                    break
+            
+            row['Has Positive Indicators'] = flags[0]
+            row['Has Negative Indicators'] = flags[1]
+            row['Has Risk Factors'] = flags[2]
+            row['Status'] = 'Success'
+            row['Error'] = ''
+        else:
+            row['Has Positive Indicators'] = ''
+            row['Has Negative Indicators'] = ''
+            row['Has Risk Factors'] = ''
+            row['Status'] = 'Error'
+            row['Error'] = result.get('error_message', 'Unknown error')
+        
+        return row
+    
     def export_to_csv(self, filename=None):
         """Export monitoring results to CSV"""
+        if not filename and self.csv_path:
+            # Rows were already streamed while monitoring
+            print(f"CSV summary exported to: {self.csv_path}")
+            return self.csv_path
+        
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"monitoring_summary_{timestamp}.csv"
         
-        # Prepare CSV data
-        csv_data = []
-        for result in self.results:
-            if result.get('monitoring_status') == 'success':
-                # Extract key metrics from summary analysis
-                summary = result.get('summary_analysis', '')
-                
-                # Simple extraction of key metrics (you can enhance this)
-                has_positive = 'positive' in summary.lower()
-                has_negative = 'negative' in summary.lower()
-                has_risk = 'risk' in summary.lower()
-                
-                csv_data.append({
-                    'Company Name': result.get('company_name', ''),
-                    'Industry': result.get('company_info', {}).get('industry', ''),
-                    'Location': result.get('company_info', {}).get('location', ''),
-                    'Monitoring Date': result.get('monitoring_date', ''),
-                    'Has Positive Indicators': has_positive,
-                    'Has Negative Indicators': has_negative,
-                    'Has Risk Factors': has_risk,
-                    'Status': 'Success'
-                })
-            else:
-                csv_data.append({
-                    'Company Name': result.get('company_name', ''),
-                    'Industry': result.get('company_info', {}).get('industry', ''),
-                    'Location': result.get('company_info', {}).get('location', ''),
-                    'Monitoring Date': result.get('monitoring_date', ''),
-                    'Has Positive Indicators': '',
-                    'Has Negative Indicators': '',
-                    'Has Risk Factors': '',
-                    'Status': f"Error: {result.get('error_message', 'Unknown error')}"
-                })
-        
-        # Write CSV
-        if csv_data:
-            fieldnames = csv_data[0].keys()
-            with open(filename, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(csv_data)
-            
-            print(f"CSV summary exported to: {filename}")
-            return filename
+        if not self.results:
+            return None
+        
+        df = pd.DataFrame([
+            {
+                'Company Name': r.get('company_name', ''),
+                'Industry': r.get('company_info', {}).get('industry', ''),
+                'Location': r.get('company_info', {}).get('location', ''),
+                'Monitoring Date': r.get('monitoring_date', ''),
+                'success': r.get('monitoring_status') == 'success',
+                'summary_analysis': r.get('summary_analysis', ''),
+                'Error': r.get('error_message', 'Unknown error')
+            }
+            for r in self.results
+        ])
+        
+        # Lowercase once, then scan every row for each keyword in a single pass
+        success = df['success']
+        summary = df['summary_analysis'].fillna('').astype(str).str.lower()
+        for column, keyword in [
+            ('Has Positive Indicators', 'positive'),
+            ('Has Negative Indicators', 'negative'),
+            ('Has Risk Factors', 'risk')
+        ]:
+            df[column] = summary.str.contains(keyword, regex=False).astype('boolean').where(success)
+        
+        df['Status'] = success.map({True: 'Success', False: 'Error'})
+        df['Error'] = df['Error'].where(~success, '')
         
-        return None
+        df[CSV_FIELDNAMES].to_csv(filename, index=False)
+        
+        print(f"CSV summary exported to: {filename}")
+        return filename
 
 async def main():
     """Main function for batch monitoring"""
     print("Batch Company Monitoring Agent")
     print("=" * 50)
     
+    listener = configure_logging()
+    
     # Initialize batch agent
     batch_agent = BatchMonitoringAgent()
     
@@ -244,6 +393,9 @@ async def main():
         
     except Exception as e:
         print(f"Error in batch monitoring: {e}")
+    finally:
+        await batch_agent.aclose()
+        listener.stop()
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
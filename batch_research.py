@@ -7,18 +7,98 @@ useful for portfolio analysis or comparing multiple lending opportunities.
 """
 
 import asyncio
-import json
+import contextlib
+import orjson
+import re
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+from collections import defaultdict
 from datetime import datetime
-from agent import save_research_result
-from config import *
-from langchain_openai import ChatOpenAI
-from browser_use import Agent
+import openai
+from tenacity import retry, stop_after_attempt, wait_random_exponential, retry_if_exception_type
+from agent import (
+    save_research_result,
+    create_llm,
+    close_llm,
+    create_prompt_cache,
+    cache_scope,
+    cache_ttl,
+    render_prompt,
+    chat
+)
+from config import (
+    BATCH_API_SETTINGS,
+    LLM_ONLY_RESEARCH_TYPES,
+    RESEARCH_TYPES,
+    SCRAPING_SETTINGS,
+    lookup_industry
+)
+from openai_batch import OpenAIBatchRunner
+from rate_limiter import AsyncRateLimiter, estimate_tokens
+import prefetch
+
+URL_PATTERN = re.compile(r"https?://([^/\s)]+)")
+
+def prompt_host(prompt):
+    """Return the host of the first URL in a prompt, if any"""
+    match = URL_PATTERN.search(prompt)
+    return match.group(1).lower() if match else None
 
 class BatchResearchManager:
-    def __init__(self):
+    def __init__(self, llm=None, semaphore=None, limiter=None):
         self.results = {}
         self.companies = []
         self.research_types = []
+        self.max_concurrency = SCRAPING_SETTINGS["max_concurrency"]
+        self.results_lock = asyncio.Lock()
+        
+        # All files for this batch go into one directory
+        self.batch_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        self.outdir = Path("runs") / self.batch_id
+        self.outdir.mkdir(parents=True, exist_ok=True)
+        
+        # Optional semaphore shared with other managers to cap overall concurrency
+        self.semaphore = semaphore
+        
+        # Paces task starts to the provider's request and token limits
+        self.limiter = limiter or AsyncRateLimiter(
+            SCRAPING_SETTINGS["requests_per_minute"],
+            SCRAPING_SETTINGS["tokens_per_minute"]
+        )
+        
+        # One LLM client (and connection pool) shared by every agent
+        self._owns_llm = llm is None
+        self.llm = llm or create_llm(max_connections=self.max_concurrency * 2)
+        self.prompt_cache = create_prompt_cache()
+        
+        # Warm browser sessions reused across tasks, one per concurrency slot;
+        # created on the first browser task so LLM-only runs never start a browser
+        self.browser_sessions = []
+        self.session_pool = None
+        
+        # HTTP session for sources fetched without a browser, created on first use
+        self.http_session = None
+        
+        # Browser tasks targeting the same site run one at a time on a warm session
+        self.host_locks = defaultdict(asyncio.Lock)
+        
+    async def aclose(self):
+        """Release the shared LLM connection pool, prompt cache and any browsers"""
+        if self._owns_llm:
+            await close_llm(self.llm)
+        if self.prompt_cache:
+            self.prompt_cache.close()
+        if self.http_session:
+            await self.http_session.close()
+        
+        await asyncio.gather(
+            *(session.kill() for session in self.browser_sessions),
+            return_exceptions=True
+        )
+        for session in self.browser_sessions:
+            shutil.rmtree(session.browser_profile.user_data_dir, ignore_errors=True)
         
     def add_company(self, company_name):
         """Add a company to the research list"""
@@ -43,55 +123,31 @@ class BatchResearchManager:
         """Run a single research task for one company"""
         print(f"Running {research_type} research for {company_name}...")
         
-        # Import the appropriate prompt
-        from agent import (
-            company_financial_snapshot_prompt,
-            company_news_sentiment_prompt,
-            industry_overview_prompt,
-            sec_filing_prompt,
-            credit_health_prompt,
-            competitive_analysis_prompt,
-            management_assessment_prompt,
-            comprehensive_risk_assessment_prompt
-        )
-        
-        # Map research types to prompts
-        prompt_map = {
-            "financial": company_financial_snapshot_prompt,
-            "news": company_news_sentiment_prompt,
-            "industry": industry_overview_prompt,
-            "sec": sec_filing_prompt,
-            "credit": credit_health_prompt,
-            "competitive": competitive_analysis_prompt,
-            "management": management_assessment_prompt,
-            "comprehensive": comprehensive_risk_assessment_prompt
-        }
-        
-        prompt = prompt_map[research_type]
-        
-        # Replace placeholders
-        if research_type == "industry":
-            industry = INDUSTRY_MAPPINGS.get(company_name, "general")
-            prompt = prompt.replace("[Industry Name]", industry)
-        else:
-            prompt = prompt.replace("[Company Name]", company_name)
-            
-        # Create and run agent
-        agent = Agent(
-            task=prompt,
-            llm=ChatOpenAI(model="gpt-4o")
-        )
+        industry = lookup_industry(company_name)
+        prompt = render_prompt(research_type, company_name, industry)
         
         try:
-            result = await agent.run()
+            result = None
+            if self.prompt_cache:
+                result = await self.prompt_cache.get(
+                    prompt,
+                    ttl=cache_ttl(research_type),
+                    scope=cache_scope(research_type, company_name)
+                )
+                if result is not None:
+                    print(f"Using cached {research_type} research for {company_name}")
+            
+            if result is None:
+                result = await self._research(prompt, research_type, company_name)
+                if self.prompt_cache:
+                    await self.prompt_cache.put(prompt, str(result), scope=cache_scope(research_type, company_name))
             
             # Store result
-            if company_name not in self.results:
-                self.results[company_name] = {}
-            self.results[company_name][research_type] = result
+            async with self.results_lock:
+                self.results.setdefault(company_name, {})[research_type] = result
             
             # Save individual result
-            await save_research_result(result, research_type, company_name.replace(" ", "_"))
+            await self._save_result(result, research_type, company_name)
             
             print(f"✓ Completed {research_type} research for {company_name}")
             return result
@@ -101,49 +157,225 @@ class BatchResearchManager:
             print(f"✗ {error_msg}")
             
             # Store error
-            if company_name not in self.results:
-                self.results[company_name] = {}
-            self.results[company_name][research_type] = {"error": error_msg}
+            async with self.results_lock:
+                self.results.setdefault(company_name, {})[research_type] = {"error": error_msg}
+            
+            return None
+            
+    @retry(
+        stop=stop_after_attempt(SCRAPING_SETTINGS["max_retries"]),
+        wait=wait_random_exponential(min=2, max=30),
+        retry=retry_if_exception_type((openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)),
+        reraise=True
+    )
+    async def _chat(self, prompt):
+        """Ask the model directly, retrying transient API failures"""
+        return await chat(prompt)
+        
+    async def _research(self, prompt, research_type, company_name):
+        """Produce a research result; a browser task that times out is not retried"""
+        if research_type in prefetch.PREFETCHERS:
+            result = await self._research_from_source(prompt, research_type, company_name)
+            if result is not None:
+                return result
+        
+        if research_type in LLM_ONLY_RESEARCH_TYPES:
+            # No browsing needed, ask the model directly
+            return await self._chat(prompt)
+        
+        host = prompt_host(prompt)
+        host_lock = self.host_locks[host] if host else contextlib.nullcontext()
+        async with host_lock:
+            from browser_use import Agent
             
+            # Create and run agent on a pooled browser session
+            session = await self._get_session_pool().get()
+            try:
+                agent = Agent(
+                    task=prompt,
+                    llm=self.llm,
+                    browser_session=session
+                )
+                return await asyncio.wait_for(agent.run(), timeout=SCRAPING_SETTINGS["task_timeout"])
+            finally:
+                await self._release_session(session)
+        
+    async def _research_from_source(self, prompt, research_type, company_name):
+        """Answer a prompt from directly fetched source text, or None to fall back to the browser"""
+        if self.http_session is None:
+            self.http_session = prefetch.create_session()
+            
+        try:
+            source = await prefetch.prefetch_source(self.http_session, research_type, company_name)
+        except Exception as e:
+            print(f"Warning: could not prefetch {research_type} source for {company_name}: {e}")
             return None
             
+        if not source:
+            return None
+        
+        print(f"Using prefetched {research_type} source for {company_name}")
+        return await self._chat(
+            prompt
+            + "\n\nThe source document has already been retrieved for you; "
+            + "answer using it instead of browsing.\n\nSOURCE:\n"
+            + source
+        )
+        
+    async def _save_result(self, result, research_type, company_name):
+        """Save one research result into the batch directory"""
+        text = str(result)
+        await save_research_result(
+            text,
+            research_type,
+            company_name.replace(" ", "_"),
+            output_dir=self.outdir,
+            is_json=text.lstrip().startswith(("{", "["))
+        )
+        
+    def _get_session_pool(self):
+        """Return the browser session pool, creating the sessions on first use"""
+        if self.session_pool is None:
+            from browser_use import BrowserSession, BrowserProfile
+            
+            self.browser_sessions = [
+                BrowserSession(
+                    browser_profile=BrowserProfile(
+                        user_data_dir=tempfile.mkdtemp(prefix="lending_research_"),
+                        headless=True,
+                        keep_alive=True
+                    )
+                )
+                for _ in range(self.max_concurrency)
+            ]
+            self.session_pool = asyncio.Queue()
+            for session in self.browser_sessions:
+                self.session_pool.put_nowait(session)
+        return self.session_pool
+        
+    async def _release_session(self, session):
+        """Reset a browser session and return it to the pool"""
+        try:
+            # Clear page state without tearing down the browser process
+            await session.navigate("about:blank")
+        except Exception as e:
+            print(f"Warning: could not reset browser session: {e}")
+        self.session_pool.put_nowait(session)
+        
+    async def _bounded(self, semaphore, company_name, research_type):
+        """Run a single research task once a concurrency slot is free"""
+        async with semaphore:
+            industry = lookup_industry(company_name)
+            prompt = render_prompt(research_type, company_name, industry)
+            await self.limiter.acquire(estimate_tokens(prompt))
+            
+            return await self.run_single_research(company_name, research_type)
+            
+    async def run_openai_batch(self, tasks):
+        """Run LLM-only (company, research_type) tasks as one OpenAI batch job"""
+        prompts = {}
+        for company_name, research_type in tasks:
+            industry = lookup_industry(company_name)
+            prompt = render_prompt(research_type, company_name, industry)
+            
+            cached = None
+            if self.prompt_cache:
+                cached = await self.prompt_cache.get(
+                    prompt,
+                    ttl=cache_ttl(research_type),
+                    scope=cache_scope(research_type, company_name)
+                )
+            if cached is not None:
+                print(f"Using cached {research_type} research for {company_name}")
+                async with self.results_lock:
+                    self.results.setdefault(company_name, {})[research_type] = cached
+                await self._save_result(cached, research_type, company_name)
+            else:
+                prompts[f"{company_name}|{research_type}"] = prompt
+                
+        if not prompts:
+            return
+        
+        runner = OpenAIBatchRunner(
+            model=BATCH_API_SETTINGS["model"],
+            poll_interval=BATCH_API_SETTINGS["poll_interval"],
+            completion_window=BATCH_API_SETTINGS["completion_window"]
+        )
+        try:
+            batch_results = await runner.run(prompts)
+        except Exception as e:
+            batch_results = {custom_id: {"error": f"OpenAI batch failed: {e}"} for custom_id in prompts}
+        finally:
+            await runner.client.close()
+            
+        # Merge batch output back into the per-company results
+        for custom_id, prompt in prompts.items():
+            company_name, research_type = custom_id.split("|", 1)
+            result = batch_results.get(custom_id, {"error": "Missing from batch output"})
+            
+            if isinstance(result, dict):
+                result = {"error": f"Error in {research_type} research for {company_name}: {result['error']}"}
+                print(f"✗ {result['error']}")
+            else:
+                if self.prompt_cache:
+                    await self.prompt_cache.put(prompt, result, scope=cache_scope(research_type, company_name))
+                await self._save_result(result, research_type, company_name)
+                print(f"✓ Completed {research_type} research for {company_name}")
+                
+            async with self.results_lock:
+                self.results.setdefault(company_name, {})[research_type] = result
+            
     async def run_batch_research(self):
-        """Run research for all companies and research types"""
+        """Run research for all companies and research types concurrently"""
         print(f"Starting batch research for {len(self.companies)} companies")
         print(f"Research types: {', '.join(self.research_types)}")
+        print(f"Max concurrency: {self.max_concurrency}")
         print("=" * 60)
         
-        total_tasks = len(self.companies) * len(self.research_types)
-        completed_tasks = 0
+        # Group by research type so tasks sharing a long prompt prefix run
+        # back-to-back and benefit from the provider's prompt cache
+        browser_tasks = [
+            (company, research_type)
+            for research_type in self.research_types
+            for company in self.companies
+        ]
+        llm_only_tasks = []
+        if BATCH_API_SETTINGS["enabled"]:
+            llm_only_tasks = [t for t in browser_tasks if t[1] in LLM_ONLY_RESEARCH_TYPES]
+            browser_tasks = [t for t in browser_tasks if t[1] not in LLM_ONLY_RESEARCH_TYPES]
         
-        for company in self.companies:
-            print(f"\n--- Researching {company} ---")
-            for research_type in self.research_types:
-                await self.run_single_research(company, research_type)
-                completed_tasks += 1
-                print(f"Progress: {completed_tasks}/{total_tasks} tasks completed")
-                
-                # Add delay between requests to be respectful
-                await asyncio.sleep(SCRAPING_SETTINGS["delay_between_requests"])
-                
+        semaphore = self.semaphore or asyncio.Semaphore(self.max_concurrency)
+        tasks = [
+            self._bounded(semaphore, company, research_type)
+            for company, research_type in browser_tasks
+        ]
+        if llm_only_tasks:
+            print(f"Submitting {len(llm_only_tasks)} LLM-only tasks to the OpenAI Batch API")
+            tasks.append(self.run_openai_batch(llm_only_tasks))
+        
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        summary = self.generate_summary()
+        total_tasks = summary["successful_researches"] + summary["failed_researches"]
         print("\n" + "=" * 60)
-        print("Batch research completed!")
+        print(f"Batch research completed! {summary['successful_researches']}/{total_tasks} tasks succeeded")
         
     def save_batch_results(self):
         """Save all batch results to a single file"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"batch_research_results_{timestamp}.json"
+        filename = self.outdir / "batch_research_results.json"
         
         batch_summary = {
             "timestamp": timestamp,
+            "batch_id": self.batch_id,
             "companies_researched": self.companies,
             "research_types": self.research_types,
             "results": self.results,
             "summary": self.generate_summary()
         }
         
-        with open(filename, "w") as f:
-            json.dump(batch_summary, f, indent=2)
+        with open(filename, "wb") as f:
+            f.write(orjson.dumps(batch_summary, default=str, option=orjson.OPT_INDENT_2))
             
         print(f"Batch results saved to: {filename}")
         return filename
@@ -172,46 +404,68 @@ class BatchResearchManager:
                 
         return summary
 
-async def main():
-    """Example batch research scenarios"""
-    
-    # Create batch research manager
-    batch_manager = BatchResearchManager()
-    
-    # Example 1: Technology companies comprehensive research
-    print("Example 1: Technology Companies Research")
-    print("=" * 50)
-    
-    tech_companies = ["Apple Inc", "Microsoft", "Google", "Amazon"]
-    batch_manager.set_companies_from_list(tech_companies)
-    batch_manager.set_research_types_from_list(["financial", "news", "comprehensive"])
-    
-    await batch_manager.run_batch_research()
-    batch_manager.save_batch_results()
-    
-    # Example 2: Financial companies credit research
-    print("\n\nExample 2: Financial Companies Credit Research")
+async def run_scenario(title, companies, research_types, llm, semaphore, limiter):
+    """Run one batch research scenario with its own manager"""
+    print(f"\nStarting scenario: {title}")
     print("=" * 50)
     
-    financial_companies = ["JPMorgan Chase", "Bank of America", "Wells Fargo"]
-    batch_manager = BatchResearchManager()
-    batch_manager.set_companies_from_list(financial_companies)
-    batch_manager.set_research_types_from_list(["credit", "sec", "management"])
-    
-    await batch_manager.run_batch_research()
-    batch_manager.save_batch_results()
+    batch_manager = BatchResearchManager(llm=llm, semaphore=semaphore, limiter=limiter)
+    batch_manager.set_companies_from_list(companies)
+    batch_manager.set_research_types_from_list(research_types)
     
-    # Example 3: Mixed industries competitive analysis
-    print("\n\nExample 3: Mixed Industries Competitive Analysis")
-    print("=" * 50)
+    try:
+        await batch_manager.run_batch_research()
+        batch_manager.save_batch_results()
+    finally:
+        await batch_manager.aclose()
+
+async def scenario_tech(llm, semaphore, limiter):
+    """Example 1: Technology companies comprehensive research"""
+    await run_scenario(
+        "Technology Companies Research",
+        ["Apple Inc", "Microsoft", "Google", "Amazon"],
+        ["financial", "news", "comprehensive"],
+        llm, semaphore, limiter
+    )
+
+async def scenario_finance(llm, semaphore, limiter):
+    """Example 2: Financial companies credit research"""
+    await run_scenario(
+        "Financial Companies Credit Research",
+        ["JPMorgan Chase", "Bank of America", "Wells Fargo"],
+        ["credit", "sec", "management"],
+        llm, semaphore, limiter
+    )
+
+async def scenario_mixed(llm, semaphore, limiter):
+    """Example 3: Mixed industries competitive analysis"""
+    await run_scenario(
+        "Mixed Industries Competitive Analysis",
+        ["Tesla", "Netflix", "Walmart", "Coca-Cola"],
+        ["competitive", "industry"],
+        llm, semaphore, limiter
+    )
+
+async def main():
+    """Example batch research scenarios, run concurrently"""
     
-    mixed_companies = ["Tesla", "Netflix", "Walmart", "Coca-Cola"]
-    batch_manager = BatchResearchManager()
-    batch_manager.set_companies_from_list(mixed_companies)
-    batch_manager.set_research_types_from_list(["competitive", "industry"])
+    # Share one LLM connection pool and one concurrency budget across scenarios
+    global_max_concurrency = SCRAPING_SETTINGS["global_max_concurrency"]
+    llm = create_llm(max_connections=global_max_concurrency * 2)
+    semaphore = asyncio.Semaphore(global_max_concurrency)
+    limiter = AsyncRateLimiter(
+        SCRAPING_SETTINGS["requests_per_minute"],
+        SCRAPING_SETTINGS["tokens_per_minute"]
+    )
     
-    await batch_manager.run_batch_research()
-    batch_manager.save_batch_results()
+    try:
+        await asyncio.gather(
+            scenario_tech(llm, semaphore, limiter),
+            scenario_finance(llm, semaphore, limiter),
+            scenario_mixed(llm, semaphore, limiter)
+        )
+    finally:
+        await close_llm(llm)
 
 if __name__ == "__main__":
     print("AI Lending Research Agent - Batch Research")
@@ -1,4 +1,10 @@
 # Configuration file for AI Lending Research Agent
+#
+# Tables are read-only (MappingProxyType / tuples) so they can be shared
+# freely without defensive copies.
+
+import sys
+from types import MappingProxyType
 
 # Default company to research
 DEFAULT_COMPANY = "Apple Inc"
@@ -7,7 +13,7 @@ DEFAULT_COMPANY = "Apple Inc"
 DEFAULT_RESEARCH_TYPE = "comprehensive"
 
 # Available research types
-RESEARCH_TYPES = {
+RESEARCH_TYPES = MappingProxyType({
     "financial": "Company Financial Snapshot",
     "news": "News Sentiment Analysis", 
     "industry": "Industry Overview",
@@ -16,10 +22,10 @@ RESEARCH_TYPES = {
     "competitive": "Competitive Analysis",
     "management": "Management Assessment",
     "comprehensive": "Comprehensive Risk Assessment"
-}
+})
 
 # Industry mappings for common companies (used in industry research)
-INDUSTRY_MAPPINGS = {
+INDUSTRY_MAPPINGS = MappingProxyType({
     "Apple Inc": "technology",
     "Microsoft": "technology", 
     "Amazon": "e-commerce",
@@ -35,35 +41,112 @@ INDUSTRY_MAPPINGS = {
     "Walmart": "retail",
     "Coca-Cola": "beverages",
     "McDonald's": "restaurants"
-}
+})
+
+# Other common names for the companies above
+INDUSTRY_ALIASES = MappingProxyType({
+    "Apple": "Apple Inc",
+    "Microsoft Corp": "Microsoft",
+    "Amazon.com": "Amazon",
+    "Tesla Inc": "Tesla",
+    "Facebook": "Meta",
+    "Meta Platforms": "Meta",
+    "Google": "Alphabet",
+    "JPMorgan": "JPMorgan Chase",
+    "JP Morgan": "JPMorgan Chase",
+    "BofA": "Bank of America",
+    "Coca Cola": "Coca-Cola",
+    "McDonalds": "McDonald's"
+})
+
+
+def _normalize_company(name):
+    """Lowercase a company name and drop punctuation that varies between spellings"""
+    return " ".join(name.lower().replace(",", " ").replace(".", " ").split())
+
+
+# Case- and punctuation-insensitive index over INDUSTRY_MAPPINGS and its aliases
+# (normalized keys are built at runtime, so intern them like literal strings)
+_INDUSTRY_LOOKUP = {sys.intern(_normalize_company(k)): v for k, v in INDUSTRY_MAPPINGS.items()}
+_INDUSTRY_LOOKUP.update(
+    {sys.intern(_normalize_company(alias)): INDUSTRY_MAPPINGS[company] for alias, company in INDUSTRY_ALIASES.items()}
+)
+_INDUSTRY_LOOKUP = MappingProxyType(_INDUSTRY_LOOKUP)
+
+# Reverse index: industry -> companies in INDUSTRY_MAPPINGS
+_companies_by_industry = {}
+for _company, _industry in INDUSTRY_MAPPINGS.items():
+    _companies_by_industry.setdefault(_industry, []).append(_company)
+COMPANIES_BY_INDUSTRY = MappingProxyType(
+    {industry: tuple(companies) for industry, companies in _companies_by_industry.items()}
+)
+del _companies_by_industry, _company, _industry
+
+
+def lookup_industry(name):
+    """Return the industry for a company name, or "general" if unknown"""
+    return _INDUSTRY_LOOKUP.get(_normalize_company(name), "general")
 
 # Output settings
-OUTPUT_SETTINGS = {
+OUTPUT_SETTINGS = MappingProxyType({
     "save_to_file": True,
     "print_to_console": True,
     "output_directory": "research_results",
     "file_format": "both"  # "json", "txt", or "both"
-}
+})
 
 # Research settings
-RESEARCH_SETTINGS = {
+RESEARCH_SETTINGS = MappingProxyType({
     "max_articles": 5,  # Maximum number of news articles to analyze
     "max_risk_factors": 5,  # Maximum number of risk factors to extract
     "include_sources": True,  # Include source URLs in output
     "sentiment_analysis": True,  # Perform sentiment analysis on news
-    "risk_rating_scale": ["Low", "Medium", "High"]  # Risk rating options
-}
+    "risk_rating_scale": ("Low", "Medium", "High")  # Risk rating options
+})
 
 # Web scraping settings
-SCRAPING_SETTINGS = {
+SCRAPING_SETTINGS = MappingProxyType({
     "delay_between_requests": 2,  # Seconds to wait between requests
+    "max_concurrency": 3,  # Maximum number of research tasks running at once
+    "global_max_concurrency": 6,  # Cap across batches running side by side
+    "requests_per_minute": 60,  # Provider request budget shared by all tasks
+    "tokens_per_minute": 150000,  # Provider token budget shared by all tasks
     "max_retries": 3,  # Maximum number of retries for failed requests
     "timeout": 30,  # Request timeout in seconds
+    "task_timeout": 600,  # Maximum seconds for a single browser research task
     "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-}
+})
+
+# SEC EDGAR settings (used to fetch filings directly instead of via the browser)
+SEC_SETTINGS = MappingProxyType({
+    "user_agent": "AI Lending Research Agent research@example.com",  # SEC requires a contact address
+    "timeout": 30,  # Request timeout in seconds
+    "max_source_chars": 20000  # Maximum filing text passed to the LLM
+})
+
+# Research types whose prompts the LLM can answer without driving a browser
+LLM_ONLY_RESEARCH_TYPES = ("competitive", "management", "comprehensive")
+
+# OpenAI Batch API settings (about 50% cheaper, results within the completion window)
+BATCH_API_SETTINGS = MappingProxyType({
+    "enabled": False,  # Route LLM-only batch research through the Batch API
+    "model": "gpt-4o",
+    "poll_interval": 30,  # Seconds between batch status checks
+    "completion_window": "24h"
+})
+
+# Prompt cache settings (skip repeated LLM/browser runs for the same prompt)
+CACHE_SETTINGS = MappingProxyType({
+    "enabled": True,
+    "path": "prompt_cache.sqlite",
+    "similarity_threshold": 0.95,  # Cosine similarity required for a cache hit
+    "ttl_seconds": 7 * 24 * 3600,  # How long cached research stays valid
+    "time_sensitive_ttl_seconds": 6 * 3600,  # Shorter TTL for fast-moving research
+    "time_sensitive_research_types": ("news", "credit", "monitoring")
+})
 
 # Financial metrics to extract (for financial research)
-FINANCIAL_METRICS = [
+FINANCIAL_METRICS = (
     "Total Revenue",
     "Net Income", 
     "Total Assets",
@@ -75,34 +158,34 @@ FINANCIAL_METRICS = [
     "Current Ratio",
     "Return on Equity (ROE)",
     "Return on Assets (ROA)"
-]
+)
 
 # Risk assessment criteria
-RISK_CRITERIA = {
-    "financial_health": ["cash_flow", "debt_levels", "profitability"],
-    "industry_risks": ["market_conditions", "regulatory_changes", "competition"],
-    "management_risks": ["leadership_stability", "governance", "track_record"],
-    "operational_risks": ["business_model", "supply_chain", "technology"]
-}
+RISK_CRITERIA = MappingProxyType({
+    "financial_health": ("cash_flow", "debt_levels", "profitability"),
+    "industry_risks": ("market_conditions", "regulatory_changes", "competition"),
+    "management_risks": ("leadership_stability", "governance", "track_record"),
+    "operational_risks": ("business_model", "supply_chain", "technology")
+})
 
 # Lending recommendation templates
-LENDING_TEMPLATES = {
-    "low_risk": {
+LENDING_TEMPLATES = MappingProxyType({
+    "low_risk": MappingProxyType({
         "interest_rate": "Prime + 1.5%",
         "covenants": "Annual financial reporting",
         "collateral": "General business assets",
         "term": "5-7 years"
-    },
-    "medium_risk": {
+    }),
+    "medium_risk": MappingProxyType({
         "interest_rate": "Prime + 2.5%", 
         "covenants": "Quarterly financial reporting",
         "collateral": "Accounts receivable and inventory",
         "term": "3-5 years"
-    },
-    "high_risk": {
+    }),
+    "high_risk": MappingProxyType({
         "interest_rate": "Prime + 4.0%",
         "covenants": "Monthly financial reporting",
         "collateral": "All business assets",
         "term": "1-3 years"
-    }
-} 
\ No newline at end of file
+    })
+}) 
\ No newline at end of file
@@ -6,73 +6,83 @@ This script demonstrates how to use the simple lending research agent
 for different research scenarios.
 """
 
+import asyncio
 from simple_agent import SimpleLendingResearchAgent
 
-def example_financial_research():
+_agent = None
+
+def get_agent():
+    """Return the shared research agent, creating it on first use"""
+    global _agent
+    if _agent is None:
+        _agent = SimpleLendingResearchAgent()
+    return _agent
+
+async def example_financial_research():
     """Example: Research company financials"""
     print("=== Example 1: Financial Research ===")
     
     try:
-        agent = SimpleLendingResearchAgent()
-        results = agent.research_company_financials("Microsoft")
+        agent = get_agent()
+        results = await agent.research_company_financials("Microsoft")
         print("Financial Research Results:")
         print(results)
         
         # Save results
-        agent.save_results(results, "Microsoft", "financials")
+        await agent.save_results_async(results, "Microsoft", "financials")
         
     except Exception as e:
         print(f"Error: {e}")
 
-def example_news_research():
+async def example_news_research():
     """Example: Research news and sentiment"""
     print("\n=== Example 2: News Research ===")
     
     try:
-        agent = SimpleLendingResearchAgent()
-        results = agent.research_news_sentiment("Tesla")
+        agent = get_agent()
+        results = await agent.research_news_sentiment("Tesla")
         print("News Research Results:")
         print(results)
         
         # Save results
-        agent.save_results(results, "Tesla", "news")
+        await agent.save_results_async(results, "Tesla", "news")
         
     except Exception as e:
         print(f"Error: {e}")
 
-def example_industry_research():
+async def example_industry_research():
     """Example: Research industry overview"""
     print("\n=== Example 3: Industry Research ===")
     
     try:
-        agent = SimpleLendingResearchAgent()
-        results = agent.research_industry_overview("banking")
+        agent = get_agent()
+        results = await agent.research_industry_overview("banking")
         print("Industry Research Results:")
         print(results)
         
         # Save results
-        agent.save_results(results, "Banking_Industry", "industry")
+        await agent.save_results_async(results, "Banking_Industry", "industry")
         
     except Exception as e:
         print(f"Error: {e}")
 
-def example_comprehensive_research():
+async def example_comprehensive_research():
     """Example: Comprehensive risk assessment"""
     print("\n=== Example 4: Comprehensive Research ===")
     
     try:
-        agent = SimpleLendingResearchAgent()
-        results = agent.comprehensive_risk_assessment("Amazon", "e-commerce")
+        agent = get_agent()
+        results = await agent.comprehensive_risk_assessment("Amazon", "e-commerce")
         print("Comprehensive Research Results:")
         print(results)
         
         # Save results
-        agent.save_results(results, "Amazon", "comprehensive")
+        await agent.save_results_async(results, "Amazon", "comprehensive")
         
     except Exception as e:
         print(f"Error: {e}")
 
-def example_batch_research():
+async def example_batch_research():
     """Example: Research multiple companies"""
     print("\n=== Example 5: Batch Research ===")
     
@@ -82,21 +92,47 @@ def example_batch_research():
         ("Walmart", "retail")
     ]
     
+    # Skip repeated entries so no company is researched twice
+    companies = list(dict.fromkeys(companies))
+    
     try:
-        agent = SimpleLendingResearchAgent()
+        agent = get_agent()
         
-        for company, industry in companies:
+        async def assess(company, industry):
             print(f"\nResearching {company}...")
-            results = agent.comprehensive_risk_assessment(company, industry)
-            
+            try:
+                return company, await agent.comprehensive_risk_assessment(company, industry)
+            except Exception as e:
+                return company, e
+                
+        # Each assessment is an independent API call, so run them concurrently
+        for future in asyncio.as_completed([assess(company, industry) for company, industry in companies]):
+            company, results = await future
+            if isinstance(results, Exception):
+                print(f"✗ Research failed for {company}: {results}")
+                continue
+                
             # Save results
-            agent.save_results(results, company, "comprehensive")
+            await agent.save_results_async(results, company, "comprehensive")
             
             print(f"✓ Completed research for {company}")
             
     except Exception as e:
         print(f"Error: {e}")
 
+async def run_examples():
+    """Run every example on one event loop so they share the agent's connections"""
+    try:
+        await example_financial_research()
+        await example_news_research()
+        await example_industry_research()
+        await example_comprehensive_research()
+        await example_batch_research()
+    finally:
+        if _agent is not None:
+            await _agent.aclose()
+        await SimpleLendingResearchAgent.aclose_clients()
+
 def main():
     """Run all examples"""
     print("Simple AI Lending Research Agent - Examples")
@@ -105,11 +141,7 @@ def main():
     print("=" * 50)
     
     # Run examples
-    example_financial_research()
-    example_news_research()
-    example_industry_research()
-    example_comprehensive_research()
-    example_batch_research()
+    asyncio.run(run_examples())
     
     print("\n" + "=" * 50)
     print("All examples completed!")
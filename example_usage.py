@@ -7,23 +7,31 @@ for different types of research scenarios.
 """
 
 import asyncio
-from agent import save_research_result
-from config import *
-from langchain_openai import ChatOpenAI
-from browser_use import Agent
+from agent import save_research_result, render_prompt, create_llm, close_llm
+from config import lookup_industry
+
+# One LLM client shared by every research run
+_llm = None
+
+def get_llm():
+    """Return the shared LLM, creating it on first use"""
+    global _llm
+    if _llm is None:
+        _llm = create_llm()
+    return _llm
 
 async def run_financial_research(company_name):
     """Run financial research for a specific company"""
     print(f"\n=== Running Financial Research for {company_name} ===")
     
-    # Import the financial prompt
-    from agent import company_financial_snapshot_prompt
+    prompt = render_prompt("financial", company_name)
     
-    prompt = company_financial_snapshot_prompt.replace("[Company Name]", company_name)
+    # Deferred: browser_use pulls in a large dependency graph
+    from browser_use import Agent
     
     agent = Agent(
         task=prompt,
-        llm=ChatOpenAI(model="gpt-4o")
+        llm=get_llm()
     )
     
     try:
@@ -41,14 +49,14 @@ async def run_news_sentiment_research(company_name):
     """Run news sentiment analysis for a specific company"""
     print(f"\n=== Running News Sentiment Analysis for {company_name} ===")
     
-    # Import the news prompt
-    from agent import company_news_sentiment_prompt
+    prompt = render_prompt("news", company_name)
     
-    prompt = company_news_sentiment_prompt.replace("[Company Name]", company_name)
+    # Deferred: browser_use pulls in a large dependency graph
+    from browser_use import Agent
     
     agent = Agent(
         task=prompt,
-        llm=ChatOpenAI(model="gpt-4o")
+        llm=get_llm()
     )
     
     try:
@@ -66,14 +74,14 @@ async def run_comprehensive_research(company_name):
     """Run comprehensive risk assessment for a specific company"""
     print(f"\n=== Running Comprehensive Risk Assessment for {company_name} ===")
     
-    # Import the comprehensive prompt
-    from agent import comprehensive_risk_assessment_prompt
+    prompt = render_prompt("comprehensive", company_name)
     
-    prompt = comprehensive_risk_assessment_prompt.replace("[Company Name]", company_name)
+    # Deferred: browser_use pulls in a large dependency graph
+    from browser_use import Agent
     
     agent = Agent(
         task=prompt,
-        llm=ChatOpenAI(model="gpt-4o")
+        llm=get_llm()
     )
     
     try:
@@ -92,16 +100,16 @@ async def run_industry_research(company_name):
     print(f"\n=== Running Industry Research for {company_name} ===")
     
     # Get the industry for the company
-    industry = INDUSTRY_MAPPINGS.get(company_name, "general")
+    industry = lookup_industry(company_name)
     
-    # Import the industry prompt
-    from agent import industry_overview_prompt
+    prompt = render_prompt("industry", company_name, industry)
     
-    prompt = industry_overview_prompt.replace("[Industry Name]", industry)
+    # Deferred: browser_use pulls in a large dependency graph
+    from browser_use import Agent
     
     agent = Agent(
         task=prompt,
-        llm=ChatOpenAI(model="gpt-4o")
+        llm=get_llm()
     )
     
     try:
@@ -115,32 +123,54 @@ async def run_industry_research(company_name):
     except Exception as e:
         print(f"Error in industry research: {e}")
 
+async def limited(semaphore, research):
+    """Run one research coroutine while holding a concurrency slot"""
+    async with semaphore:
+        return await research
+
 async def main():
     """Main function demonstrating different research scenarios"""
     
-    # Example 1: Research a technology company
-    print("Example 1: Technology Company Research")
-    print("=" * 50)
+    # The research runs are independent, so run them side by side,
+    # bounded to stay within OpenAI rate limits
+    semaphore = asyncio.Semaphore(4)
     
-    tech_company = "Microsoft"
-    await run_financial_research(tech_company)
-    await run_news_sentiment_research(tech_company)
-    await run_industry_research(tech_company)
+    # Example 1: Research a technology company
+    async def tech_example():
+        print("Example 1: Technology Company Research")
+        print("=" * 50)
+        
+        tech_company = "Microsoft"
+        await asyncio.gather(
+            limited(semaphore, run_financial_research(tech_company)),
+            limited(semaphore, run_news_sentiment_research(tech_company)),
+            limited(semaphore, run_industry_research(tech_company))
+        )
     
     # Example 2: Research a financial company
-    print("\n\nExample 2: Financial Company Research")
-    print("=" * 50)
-    
-    financial_company = "JPMorgan Chase"
-    await run_comprehensive_research(financial_company)
+    async def financial_example():
+        print("\n\nExample 2: Financial Company Research")
+        print("=" * 50)
+        
+        financial_company = "JPMorgan Chase"
+        await limited(semaphore, run_comprehensive_research(financial_company))
     
     # Example 3: Research a retail company
-    print("\n\nExample 3: Retail Company Research")
-    print("=" * 50)
+    async def retail_example():
+        print("\n\nExample 3: Retail Company Research")
+        print("=" * 50)
+        
+        retail_company = "Walmart"
+        await asyncio.gather(
+            limited(semaphore, run_financial_research(retail_company)),
+            limited(semaphore, run_news_sentiment_research(retail_company))
+        )
     
-    retail_company = "Walmart"
-    await run_financial_research(retail_company)
-    await run_news_sentiment_research(retail_company)
+    try:
+        await asyncio.gather(tech_example(), financial_example(), retail_example())
+    finally:
+        if _llm is not None:
+            await close_llm(_llm)
     
     print("\n" + "=" * 50)
     print("All research examples completed!")
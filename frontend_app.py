@@ -6,12 +6,13 @@ Simple MCP Chat Interface
 import streamlit as st
 import subprocess
 import os
-import json
+import orjson
+import atexit
+import itertools
+import collections
+import threading
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
 # Page config
 st.set_page_config(
     page_title="MCP Chat",
@@ -19,7 +20,19 @@ st.set_page_config(
     layout="wide"
 )
 
-def create_json_rpc_request(query: str, request_id: int = 2) -> str:
+# Streamlit re-executes this script on every rerun, so one-off setup is cached
+@st.cache_resource(show_spinner=False)
+def _load_env():
+    """Load environment variables from .env once per process"""
+    load_dotenv()
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _api_key_status() -> bool:
+    """Whether a real (non-placeholder) FIRECRAWL_API_KEY is configured"""
+    api_key = os.getenv("FIRECRAWL_API_KEY")
+    return bool(api_key) and not api_key.startswith("your_")
+
+def create_json_rpc_request(query: str, request_id: int = 2) -> bytes:
     """
     Takes a simple string and wraps it in the required JSON-RPC structure.
 
@@ -28,7 +41,7 @@ def create_json_rpc_request(query: str, request_id: int = 2) -> str:
         request_id (int): A unique ID for the request.
 
     Returns:
-        A JSON-formatted string ready to be sent to the MCP server.
+        A JSON-encoded line (bytes) ready to be sent to the MCP server.
     """
     request_object = {
         "jsonrpc": "2.0",
@@ -39,111 +52,168 @@ def create_json_rpc_request(query: str, request_id: int = 2) -> str:
             "arguments": {"query": query}
         }
     }
-    # Use json.dumps to serialize the Python dictionary into a JSON string.
-    return json.dumps(request_object, indent=2)
+    # orjson emits compact JSON on a single line, as the stdio transport expects.
+    return orjson.dumps(request_object)
+
+# MCP server launch settings
+MCP_SERVER_COMMAND = ["node", "firecrawl-mcp-server/dist/index.js"]
+MCP_SERVER_CWD = "/Users/solidliquidity/Downloads/projects/ai-lending-agent"
+# Scraped search results can be hundreds of KB on a single line
+MCP_PIPE_BUFFER_SIZE = 131072
+# Echo the server's stderr and the MCP responses to the console (set MCP_DEBUG=1)
+MCP_DEBUG = bool(os.getenv("MCP_DEBUG"))
+
+INIT_REQUEST = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {
+            "roots": {"listChanged": True},
+            "sampling": {}
+        },
+        "clientInfo": {
+            "name": "frontend_app",
+            "version": "1.0.0"
+        }
+    }
+}
 
-def send_to_mcp_server(json_rpc_request: str):
+# Sent once after the initialize response; notifications get no reply
+INITIALIZED_NOTIFICATION = {
+    "jsonrpc": "2.0",
+    "method": "notifications/initialized"
+}
+
+class MCPConnection:
     """
-    Sends the JSON-RPC request to the MCP server and returns the response.
-    Just replicates what works in terminal.
+    A long-lived MCP server process, initialized once and reused for every query.
     """
-    try:
-        # Prepare both requests
-        init_request = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "initialize",
-            "params": {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {
-                    "roots": {"listChanged": True},
-                    "sampling": {}
-                },
-                "clientInfo": {
-                    "name": "frontend_app",
-                    "version": "1.0.0"
-                }
-            }
-        }
-        
-        # Try interactive approach with Popen
-        process = subprocess.Popen(
-            ["node", "firecrawl-mcp-server/dist/index.js"],
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            MCP_SERVER_COMMAND,
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
-            cwd="/Users/solidliquidity/Downloads/projects/ai-lending-agent"
+            bufsize=MCP_PIPE_BUFFER_SIZE,
+            cwd=MCP_SERVER_CWD
         )
-        
-        # Step 1: Send init and wait for response
-        init_json = json.dumps(init_request) + "\n"
-        process.stdin.write(init_json)
-        process.stdin.flush()
-        
-        # Read init response
-        init_response = process.stdout.readline()
-        print(f"DEBUG: Init response: {init_response.strip()}")
-        
-        # Step 2: Send tool request
-        process.stdin.write(json_rpc_request + "\n")
-        process.stdin.flush()
-        
-        # Read tool response
-        tool_response = process.stdout.readline()
-        print(f"DEBUG: Tool response: {tool_response.strip()}")
-        
-        # Close and clean up
-        process.stdin.close()
-        process.wait()
-        
-        result = type('obj', (object,), {
-            'returncode': process.returncode,
-            'stdout': init_response + tool_response,
-            'stderr': process.stderr.read() if process.stderr else ""
-        })()
-        
-        if result.returncode != 0:
-            return {"error": f"MCP server exited with code {result.returncode}: {result.stderr}"}
-        
-        if not result.stdout.strip():
-            return {"error": "No response from MCP server"}
-        
-        # Debug: let's see what we got back
-        print(f"DEBUG: MCP server response:\n{result.stdout}")
-        print(f"DEBUG: MCP server stderr:\n{result.stderr}")
-        
-        # Parse responses
-        lines = [line.strip() for line in result.stdout.strip().split('\n') if line.strip()]
-        
-        # Filter out only JSON lines
-        json_lines = []
-        for line in lines:
+        # Streamlit may serve several sessions at once; one request/response at a time
+        self.lock = threading.Lock()
+        self.request_ids = itertools.count(2)
+
+        # Drain stderr continuously so a chatty server can't block on a full pipe;
+        # keep the tail for error messages
+        self.stderr_tail = collections.deque(maxlen=50)
+        self.stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self.stderr_thread.start()
+
+        # Send init and wait for response
+        with self.lock:
+            init_response = self._exchange(orjson.dumps(INIT_REQUEST), INIT_REQUEST["id"])
+            # Complete the handshake; from here on each query is one request and one response
+            self.process.stdin.write(orjson.dumps(INITIALIZED_NOTIFICATION) + b"\n")
+            self.process.stdin.flush()
+        if MCP_DEBUG:
+            print(f"DEBUG: Init response: {init_response}")
+
+        atexit.register(self.close)
+
+    def _exchange(self, json_rpc_request: bytes, request_id: int):
+        """Write one request line and return the parsed response with the same id"""
+        self.process.stdin.write(json_rpc_request + b"\n")
+        self.process.stdin.flush()
+
+        # One JSON message per line: parse each exactly once and dispatch by id.
+        # The pipes are binary, so lines go straight to orjson without decoding.
+        for line in iter(self.process.stdout.readline, b""):
             try:
-                json.loads(line)
-                json_lines.append(line)
-            except json.JSONDecodeError:
-                continue
-        
-        if len(json_lines) < 2:
-            return {"error": f"Incomplete response. Expected 2 JSON responses, got {len(json_lines)}. Full output: {result.stdout}"}
-        
-        # Return the tool response (last JSON line)
-        tool_response = json.loads(json_lines[-1])
+                message = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                continue  # Stray log output from the server
+            if message.get("id") == request_id:
+                return message
+            # Anything else is a notification or a stale response; drop it
+
+        return None  # Server closed its stdout
+
+    def send(self, json_rpc_request: bytes, request_id: int):
+        """Send a request and return its parsed response, or None if the server went away"""
+        with self.lock:
+            return self._exchange(json_rpc_request, request_id)
+
+    def _drain_stderr(self):
+        """Read the server's stderr line by line until it exits"""
+        for line in iter(self.process.stderr.readline, b""):
+            line = line.decode(errors="replace").rstrip()
+            self.stderr_tail.append(line)
+            if MCP_DEBUG:
+                print(f"DEBUG: MCP server stderr: {line}")
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def close(self):
+        """Shut the server down by closing its stdin"""
+        if self.is_alive():
+            self.process.stdin.close()
+            self.process.wait()
+
+@st.cache_resource
+def get_mcp_process() -> MCPConnection:
+    """
+    Returns the shared MCP server connection, starting it on first use.
+    """
+    return MCPConnection()
+
+def send_to_mcp_server(query: str):
+    """
+    Sends a query to the MCP server and returns the response.
+    """
+    try:
+        connection = get_mcp_process()
+        if not connection.is_alive():
+            # The server died since the last query; start a fresh one
+            get_mcp_process.clear()
+            connection = get_mcp_process()
+
+        request_id = next(connection.request_ids)
+        json_rpc_request = create_json_rpc_request(query, request_id)
+        tool_response = connection.send(json_rpc_request, request_id)
+        if MCP_DEBUG:
+            print(f"DEBUG: Tool response: {tool_response}")
+
+        if tool_response is None:
+            connection.process.wait()
+            connection.stderr_thread.join(timeout=1)
+            stderr = "\n".join(connection.stderr_tail)
+            get_mcp_process.clear()
+            return {"error": f"MCP server exited with code {connection.process.returncode}: {stderr}"}
+
         return tool_response
-        
-    except subprocess.TimeoutExpired:
-        return {"error": "MCP server timeout"}
-    except json.JSONDecodeError as e:
-        return {"error": f"Invalid JSON response: {e}"}
+
     except Exception as e:
         return {"error": f"Failed to communicate with MCP server: {str(e)}"}
 
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def cached_mcp(query: str) -> dict:
+    """
+    Returns the MCP response for a query, reusing results for repeated queries.
+    Errors are raised rather than returned so they are never cached.
+    """
+    response = send_to_mcp_server(query)
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    return response
+
 def main():
     st.title("🤖 MCP Chat")
     
     # Check API key
-    if not os.getenv("FIRECRAWL_API_KEY"):
+    _load_env()
+    if not _api_key_status():
         st.error("❌ FIRECRAWL_API_KEY not found")
         st.stop()
     
@@ -166,8 +236,10 @@ def main():
         # Process and respond
         with st.chat_message("assistant"):
             with st.spinner("Processing..."):
-                json_rpc_request = create_json_rpc_request(prompt)
-                response = send_to_mcp_server(json_rpc_request)
+                try:
+                    response = cached_mcp(prompt)
+                except RuntimeError as e:
+                    response = {"error": str(e)}
                 
                 if "error" in response:
                     response_text = f"❌ Error: {response['error']}"
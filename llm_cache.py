@@ -0,0 +1,170 @@
+"""
+Prompt Cache for AI Lending Research Agent
+
+Stores previous (prompt, result) pairs in a local SQLite database together
+with an embedding of the prompt, so repeated or paraphrased research requests
+can be answered without re-running the LLM or browser agent. Entries can be
+stored under a scope (e.g. company and research type); lookups only match
+entries in the same scope, so templated prompts that differ only in the
+company name never return another company's result.
+
+LLMCache is a lighter exact-match cache for individual chat completions,
+keyed by a hash of the full request.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+import numpy as np
+
+# Query embeddings kept between get() and put(); lookups whose completion
+# fails never call put(), so only the most recent ones are kept
+MAX_PENDING_EMBEDDINGS = 256
+
+
+class PromptCache:
+    def __init__(self, path="prompt_cache.sqlite", embed=None, similarity_threshold=0.95):
+        self.path = path
+        self.similarity_threshold = similarity_threshold
+        self._embed = embed
+        self._pending = OrderedDict()
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS prompt_cache ("
+            "id INTEGER PRIMARY KEY, prompt TEXT, embedding BLOB, result TEXT, ts REAL, scope TEXT)"
+        )
+        # Caches written before scoping lack the column; their rows only match unscoped lookups
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(prompt_cache)")}
+        if "scope" not in columns:
+            self.conn.execute("ALTER TABLE prompt_cache ADD COLUMN scope TEXT")
+        self.conn.commit()
+
+        # Keep the (small) index in memory so lookups are a single matrix product
+        rows = self.conn.execute("SELECT prompt, embedding, result, ts, scope FROM prompt_cache").fetchall()
+        self.prompts = [row[0] for row in rows]
+        self.results = [row[2] for row in rows]
+        self.timestamps = [row[3] for row in rows]
+        self.scopes = [row[4] for row in rows]
+        if rows:
+            self.vectors = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+        else:
+            self.vectors = None
+
+    async def embed(self, text):
+        """Embed text as an L2-normalised float32 vector"""
+        if self._embed is None:
+            from langchain_openai import OpenAIEmbeddings
+            self._embed = OpenAIEmbeddings(model="text-embedding-3-small").aembed_query
+
+        vector = np.asarray(await self._embed(text), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def add_embedding(self, prompt, vector):
+        """Supply a precomputed embedding for prompt (e.g. from a batched request) for get() and put()"""
+        vector = np.asarray(vector, dtype=np.float32)
+        self._remember(prompt, vector / (np.linalg.norm(vector) or 1.0))
+
+    def _remember(self, prompt, vector):
+        """Keep a query embedding for put(), dropping the oldest beyond MAX_PENDING_EMBEDDINGS"""
+        self._pending[prompt] = vector
+        self._pending.move_to_end(prompt)
+        while len(self._pending) > MAX_PENDING_EMBEDDINGS:
+            self._pending.popitem(last=False)
+
+    def _is_fresh(self, index, ttl):
+        return ttl is None or time.time() - self.timestamps[index] < ttl
+
+    async def get(self, prompt, ttl=None, scope=None):
+        """Return the cached result for prompt (or a near-duplicate in the same scope), or None"""
+        candidates = [i for i in range(len(self.prompts)) if self.scopes[i] == scope]
+
+        # Exact matches never need an embedding round-trip
+        for i in reversed(candidates):
+            if self.prompts[i] == prompt and self._is_fresh(i, ttl):
+                return self.results[i]
+
+        query = self._pending.get(prompt)
+        if query is None:
+            query = await self.embed(prompt)
+            self._remember(prompt, query)
+        if not candidates:
+            return None
+
+        candidates = np.asarray(candidates)
+        scores = self.vectors[candidates] @ query
+        for j in np.argsort(scores)[::-1]:
+            if scores[j] < self.similarity_threshold:
+                break
+            if self._is_fresh(candidates[j], ttl):
+                return self.results[candidates[j]]
+
+        return None
+
+    async def put(self, prompt, result, scope=None):
+        """Store a result for prompt under scope, reusing the embedding computed by get()"""
+        vector = self._pending.pop(prompt, None)
+        if vector is None:
+            vector = await self.embed(prompt)
+
+        ts = time.time()
+        self.conn.execute(
+            "INSERT INTO prompt_cache (prompt, embedding, result, ts, scope) VALUES (?, ?, ?, ?, ?)",
+            (prompt, vector.tobytes(), result, ts, scope)
+        )
+        self.conn.commit()
+
+        self.prompts.append(prompt)
+        self.results.append(result)
+        self.timestamps.append(ts)
+        self.scopes.append(scope)
+        self.vectors = vector[None, :] if self.vectors is None else np.vstack([self.vectors, vector])
+
+    def close(self):
+        """Close the underlying SQLite connection"""
+        self.conn.close()
+
+
+class LLMCache:
+    def __init__(self, directory=".cache/llm", max_temperature=0.0):
+        self.directory = directory
+        self.max_temperature = max_temperature
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def cache_key(self, model, messages, temperature):
+        """Hash a chat request, or return None if it is too random to cache"""
+        if temperature > self.max_temperature:
+            return None
+        payload = {"model": model, "messages": messages, "temperature": temperature}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached completion for key, or None"""
+        if key is not None:
+            try:
+                with open(self._path(key)) as f:
+                    result = json.load(f)["result"]
+                self.hits += 1
+                return result
+            except (OSError, ValueError, KeyError):
+                pass
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+        """Store a completion under key"""
+        if key is None:
+            return
+        # Write then rename so a concurrent reader never sees a partial file
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"result": result, "ts": time.time()}, f)
+        os.replace(tmp_path, self._path(key))
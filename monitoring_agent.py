@@ -8,16 +8,253 @@ for a given company to provide comprehensive insights for lending decisions.
 
 import asyncio
 import json
+import logging
+import queue
+import re
 import time
 import os
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime, timedelta
+from urllib.parse import quote, quote_plus, urlparse
 from dotenv import load_dotenv
 import aiohttp
+import orjson
 import requests
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from llm_cache import LLMCache, PromptCache
+from config import CACHE_SETTINGS
 
 # Load environment variables
 load_dotenv()
 
+log = logging.getLogger("monitoring_agent")
+
+# Maximum number of crawl requests in flight against the Firecrawl server
+MAX_CONCURRENT_CRAWLS = 8
+
+# Page text kept per crawl; analyses only ever read the first 4000 characters
+MAX_CRAWL_CHARS = 8000
+
+# Default extraction rules: main content only, trimmed server-side to what we keep
+DEFAULT_EXTRACTION_RULES = {
+    "onlyMainContent": True,
+    "formats": ["markdown"],
+    "includeTags": ["article", "main", "h1", "h2", "h3", "p"],
+    "excludeTags": ["script", "style", "nav", "footer", "header", "aside"],
+    "maxChars": MAX_CRAWL_CHARS
+}
+
+# Pages with less text than this are not worth an analysis call
+MIN_ANALYSIS_CHARS = 200
+
+# How long a crawled page is reused before it is fetched again
+CRAWL_TTL_SECONDS = 600
+
+# Per-attempt crawl timeout in seconds, and the statuses worth retrying
+CRAWL_TIMEOUT = 15
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Wall-clock budget for crawling all sources; slower sources are reported as timed out
+MONITORING_TIMEOUT = 60
+
+# Model and temperature for per-source analyses and the summary
+ANALYSIS_MODEL = "gpt-4o-mini"
+ANALYSIS_TEMPERATURE = 0.1
+
+# Cosine similarity at which a previous analysis is reused for near-identical content
+SEMANTIC_CACHE_THRESHOLD = 0.92
+
+# Per-source analysis prompts; {content} is filled with the first 4000 characters of the page
+_PROMPTS = {
+    "sentiment": """
+Analyze the sentiment of the following content about a company.
+Focus on aspects relevant to lending decisions.
+
+Content: {content}
+
+Provide:
+1. Overall sentiment (positive/negative/neutral)
+2. Key positive factors
+3. Key negative factors
+4. Risk indicators for lenders
+5. Confidence level in assessment
+""",
+    "reviews": """
+Analyze customer reviews for lending insights.
+
+Reviews: {content}
+
+Provide:
+1. Overall customer satisfaction score (1-10)
+2. Key positive feedback themes
+3. Key negative feedback themes
+4. Business health indicators
+5. Customer retention signals
+6. Risk assessment for lenders
+""",
+    "news": """
+Analyze news content for company health and lending implications.
+
+News: {content}
+
+Provide:
+1. News sentiment (positive/negative/neutral)
+2. Key developments affecting business
+3. Financial implications
+4. Market position changes
+5. Risk factors for lenders
+6. Recommended monitoring areas
+""",
+    "financial": """
+Extract financial insights from the content.
+
+Content: {content}
+
+Provide:
+1. Financial performance indicators
+2. Revenue/profit mentions
+3. Debt/financing information
+4. Growth signals
+5. Risk factors
+6. Creditworthiness indicators
+"""
+}
+
+def _object_schema(properties):
+    """JSON schema for an object with exactly these properties, as strict structured outputs expect"""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+_TEXT_LIST = {"type": "array", "items": {"type": "string"}}
+_SENTIMENT = {"type": "string", "enum": ["positive", "negative", "neutral"]}
+
+# Structured output for each analysis type, one field per numbered item of its prompt
+SENTIMENT_SCHEMA = _object_schema({
+    "overall_sentiment": _SENTIMENT,
+    "positive_factors": _TEXT_LIST,
+    "negative_factors": _TEXT_LIST,
+    "risk_indicators": _TEXT_LIST,
+    "confidence": {"type": "string", "enum": ["low", "medium", "high"]}
+})
+
+REVIEWS_SCHEMA = _object_schema({
+    "satisfaction_score": {"type": "integer"},
+    "positive_themes": _TEXT_LIST,
+    "negative_themes": _TEXT_LIST,
+    "business_health_indicators": _TEXT_LIST,
+    "retention_signals": _TEXT_LIST,
+    "lender_risks": _TEXT_LIST
+})
+
+NEWS_SCHEMA = _object_schema({
+    "news_sentiment": _SENTIMENT,
+    "key_developments": _TEXT_LIST,
+    "financial_implications": _TEXT_LIST,
+    "market_position_changes": _TEXT_LIST,
+    "lender_risks": _TEXT_LIST,
+    "monitoring_areas": _TEXT_LIST
+})
+
+FINANCIAL_SCHEMA = _object_schema({
+    "performance_indicators": _TEXT_LIST,
+    "revenue_profit_mentions": _TEXT_LIST,
+    "debt_financing": _TEXT_LIST,
+    "growth_signals": _TEXT_LIST,
+    "risk_factors": _TEXT_LIST,
+    "creditworthiness_indicators": _TEXT_LIST
+})
+
+ANALYSIS_SCHEMAS = {
+    "sentiment": SENTIMENT_SCHEMA,
+    "reviews": REVIEWS_SCHEMA,
+    "news": NEWS_SCHEMA,
+    "financial": FINANCIAL_SCHEMA
+}
+
+def _response_format(name, schema):
+    """response_format asking the model for JSON matching schema"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "schema": schema, "strict": True}
+    }
+
+# Sections of the combined per-company analysis: section -> (report key, analysis type, what to provide)
+BUNDLE_SECTIONS = {
+    "reviews": (
+        "google_reviews",
+        "reviews",
+        "customer satisfaction score (1-10), positive and negative feedback themes, "
+        "business health indicators, customer retention signals, risks for lenders"
+    ),
+    "news": (
+        "news_sources",
+        "news",
+        "news sentiment (positive/negative/neutral), key developments, financial implications, "
+        "market position changes, risk factors for lenders, recommended monitoring areas"
+    ),
+    "social": (
+        "social_media",
+        "sentiment",
+        "overall sentiment (positive/negative/neutral), key positive factors, key negative factors, "
+        "risk indicators for lenders, confidence level"
+    ),
+    "financial": (
+        "company_website",
+        "financial",
+        "financial performance indicators, revenue/profit mentions, debt/financing information, "
+        "growth signals, risk factors, creditworthiness indicators"
+    )
+}
+
+class RetryableCrawlError(Exception):
+    """A crawl failed with a transient status"""
+
+def _summary_digest(sources_monitored, source_analyses):
+    """Compact text for the summary prompt: one line per analysis and per unavailable source"""
+    lines = [
+        f"[{section}] {orjson.dumps(analysis).decode()[:800]}"
+        for section, analysis in source_analyses.items()
+    ]
+    for key, entries in sources_monitored.items():
+        entries = entries if isinstance(entries, list) else [entries]
+        errors = [entry.get("error") if isinstance(entry, dict) else entry for entry in entries]
+        if all(errors):
+            lines.append(f"[{key}] unavailable: {str(errors[0])[:200]}")
+    return "\n".join(lines)
+
+def _has_content(content):
+    """Whether crawled content is a real page with enough text to analyze"""
+    return bool(content) and not content.startswith("Error") and len(content.strip()) >= MIN_ANALYSIS_CHARS
+
+def _load_analysis(cached):
+    """Parse an analysis from the semantic cache, which stores text; free-form analyses predate JSON output"""
+    if cached is None:
+        return None
+    try:
+        return json.loads(cached)
+    except ValueError:
+        return None
+
+def encode_company_name(company_name):
+    """URL-encoded forms of a company name for building source URLs"""
+    return {
+        "q": quote_plus(company_name),
+        "path": quote(company_name),
+        "compact": quote(company_name.replace(" ", "")),
+        # Host names cannot be percent-encoded, so keep only letters and digits
+        "slug": re.sub(r"[^a-z0-9]", "", company_name.lower())
+    }
+
+def _task_outcome(task):
+    """Result of a finished monitoring task, its exception, or a timeout error if it was cancelled"""
+    if task.cancelled():
+        return {"error": "timeout"}
+    return task.exception() or task.result()
+
 class CompanyMonitoringAgent:
     def __init__(self, firecrawl_url="http://localhost:3000", openai_api_key=None):
         self.firecrawl_url = firecrawl_url
@@ -32,245 +269,397 @@ class CompanyMonitoringAgent:
         
         # Initialize OpenAI client
         try:
-            from openai import OpenAI
-            self.openai_client = OpenAI(api_key=self.openai_api_key)
+            from openai import AsyncOpenAI
+            self.openai_client = AsyncOpenAI(api_key=self.openai_api_key)
         except ImportError:
             raise ImportError("Please install openai: pip install openai")
+        
+        # Shared HTTP session, created on first crawl and closed by aclose()
+        self._session = None
+        self._crawl_semaphore = asyncio.Semaphore(MAX_CONCURRENT_CRAWLS)
+        
+        # (url, extraction rules) -> (timestamp, content) for recently crawled pages
+        self._crawl_cache = {}
+        
+        # Identical pages (error pages, unchanged homepages) reuse earlier analyses;
+        # at temperature 0.1 the completions are near-deterministic
+        self.llm_cache = LLMCache(max_temperature=ANALYSIS_TEMPERATURE)
+        
+        # Near-duplicate content (the same story on several sites, lightly edited pages)
+        # is matched by embedding; one cache per analysis type so prompts never cross,
+        # and entries are scoped to the company so one company's analysis never answers another
+        self._semantic_caches = {}
+    
+    async def _get_session(self):
+        """Return the shared HTTP session so crawls reuse pooled keep-alive connections"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=60),
+                json_serialize=lambda obj: orjson.dumps(obj).decode()
+            )
+        return self._session
+    
+    async def aclose(self):
+        """Close the shared HTTP session and the semantic caches"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        for cache in self._semantic_caches.values():
+            cache.close()
+        self._semantic_caches = {}
+    
+    async def _embed(self, text):
+        """Embed text with the agent's OpenAI client"""
+        return (await self._embed_many([text]))[0]
+    
+    async def _embed_many(self, texts):
+        """Embed several texts with a single embeddings request"""
+        response = await self.openai_client.embeddings.create(
+            model="text-embedding-3-small",
+            input=texts
+        )
+        return [item.embedding for item in response.data]
+    
+    def _semantic_cache(self, analysis_type):
+        """Return the semantic cache for an analysis type, or None when caching is disabled"""
+        if not CACHE_SETTINGS["enabled"]:
+            return None
+        if analysis_type not in self._semantic_caches:
+            root, ext = os.path.splitext(CACHE_SETTINGS["path"])
+            self._semantic_caches[analysis_type] = PromptCache(
+                path=f"{root}_monitoring_{analysis_type}{ext}",
+                embed=self._embed,
+                similarity_threshold=SEMANTIC_CACHE_THRESHOLD
+            )
+        return self._semantic_caches[analysis_type]
     
     async def crawl_website(self, url, extraction_rules=None):
         """Crawl a website using Firecrawl MCP server"""
         try:
             # Default extraction rules for general content
             if not extraction_rules:
-                extraction_rules = {
-                    "extract": "text",
-                    "includeTags": ["p", "h1", "h2", "h3", "h4", "h5", "h6", "span", "div"],
-                    "excludeTags": ["script", "style", "nav", "footer", "header"]
-                }
+                extraction_rules = DEFAULT_EXTRACTION_RULES
             
             payload = {
                 "url": url,
                 "extraction_rules": extraction_rules
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"{self.firecrawl_url}/crawl", json=payload) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data.get("content", "")
-                    else:
-                        return f"Error crawling {url}: {response.status}"
+            # No await between lookup and store, so the event loop needs no lock here
+            cache_key = (url, json.dumps(extraction_rules, sort_keys=True))
+            cached = self._crawl_cache.get(cache_key)
+            if cached and time.time() - cached[0] < CRAWL_TTL_SECONDS:
+                return cached[1]
+            
+            content = await self._crawl_once(url, payload)
+            if content and not content.startswith("Error"):
+                self._crawl_cache[cache_key] = (time.time(), content)
+            return content
                         
+        except asyncio.TimeoutError:
+            return f"Error crawling {url}: timed out after {CRAWL_TIMEOUT}s"
         except Exception as e:
             return f"Error crawling {url}: {e}"
     
-    def analyze_content_with_ai(self, content, analysis_type):
-        """Analyze content using OpenAI"""
-        prompts = {
-            "sentiment": f"""
-            Analyze the sentiment of the following content about a company.
-            Focus on aspects relevant to lending decisions.
-            
-            Content: {content[:4000]}  # Limit content length
-            
-            Provide:
-            1. Overall sentiment (positive/negative/neutral)
-            2. Key positive factors
-            3. Key negative factors
-            4. Risk indicators for lenders
-            5. Confidence level in assessment
-            """,
-            
-            "reviews": f"""
-            Analyze customer reviews for lending insights.
-            
-            Reviews: {content[:4000]}
-            
-            Provide:
-            1. Overall customer satisfaction score (1-10)
-            2. Key positive feedback themes
-            3. Key negative feedback themes
-            4. Business health indicators
-            5. Customer retention signals
-            6. Risk assessment for lenders
-            """,
-            
-            "news": f"""
-            Analyze news content for company health and lending implications.
-            
-            News: {content[:4000]}
-            
-            Provide:
-            1. News sentiment (positive/negative/neutral)
-            2. Key developments affecting business
-            3. Financial implications
-            4. Market position changes
-            5. Risk factors for lenders
-            6. Recommended monitoring areas
-            """,
-            
-            "financial": f"""
-            Extract financial insights from the content.
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=0.5, max=4),
+        retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError, RetryableCrawlError)),
+        reraise=True
+    )
+    async def _crawl_once(self, url, payload):
+        """POST one crawl request, raising on timeouts and transient failures so they are retried"""
+        session = await self._get_session()
+        async with self._crawl_semaphore:
+            async with session.post(
+                f"{self.firecrawl_url}/crawl",
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=CRAWL_TIMEOUT)
+            ) as response:
+                if response.status == 200:
+                    # Firecrawl payloads are large and text-heavy; orjson parses them much faster
+                    data = orjson.loads(await response.read())
+                    return data.get("content", "")[:MAX_CRAWL_CHARS]
+                if response.status in RETRYABLE_STATUSES:
+                    raise RetryableCrawlError(f"HTTP {response.status}")
+                return f"Error crawling {url}: {response.status}"
+    
+    async def analyze_content_with_ai(self, content, analysis_type, company_name=None):
+        """Analyze content using OpenAI, returning a dict matching the analysis type's schema
+        
+        Near-duplicate content is only answered from earlier analyses of the same
+        company; without company_name the semantic cache is skipped.
+        """
+        if not _has_content(content):
+            return {"error": "no_content"}
+        if analysis_type not in _PROMPTS:
+            analysis_type = "sentiment"
+        prompt = _PROMPTS[analysis_type].format(content=content[:4000])
+        messages = [{"role": "user", "content": prompt}]
+        cache_key = self.llm_cache.cache_key(ANALYSIS_MODEL, messages, ANALYSIS_TEMPERATURE)
+        cached = self.llm_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            semantic_cache = self._semantic_cache(analysis_type) if company_name else None
+            if semantic_cache:
+                analysis = _load_analysis(await semantic_cache.get(
+                    prompt, ttl=CACHE_SETTINGS["time_sensitive_ttl_seconds"], scope=company_name
+                ))
+                if analysis is not None:
+                    self.llm_cache.put(cache_key, analysis)
+                    return analysis
             
-            Content: {content[:4000]}
+            response = await self.openai_client.chat.completions.create(
+                model=ANALYSIS_MODEL,
+                messages=messages,
+                temperature=ANALYSIS_TEMPERATURE,
+                response_format=_response_format(analysis_type, ANALYSIS_SCHEMAS[analysis_type])
+            )
+            analysis = json.loads(response.choices[0].message.content)
             
-            Provide:
-            1. Financial performance indicators
-            2. Revenue/profit mentions
-            3. Debt/financing information
-            4. Growth signals
-            5. Risk factors
-            6. Creditworthiness indicators
-            """
-        }
+            if semantic_cache:
+                await semantic_cache.put(prompt, json.dumps(analysis), scope=company_name)
+        except Exception as e:
+            return {"error": f"Error analyzing content: {e}"}
+        
+        self.llm_cache.put(cache_key, analysis)
+        return analysis
+    
+    async def analyze_bundle(self, sections):
+        """Analyze several sources in one completion, returning {section: analysis}"""
+        parts = [
+            "Analyze the following content about a company for lending decisions.",
+            "Each section starts with a <<<SECTION name>>> line.",
+            "",
+            "For each section present, provide:"
+        ]
+        parts += [f"- {name}: {BUNDLE_SECTIONS[name][2]}" for name in sections]
+        parts += [
+            "",
+            "Respond with a JSON object with one key per section name.",
+            ""
+        ]
+        for name, content in sections.items():
+            parts += [f"<<<SECTION {name}>>>", content, ""]
+        
+        messages = [{"role": "user", "content": "\n".join(parts)}]
+        cache_key = self.llm_cache.cache_key(ANALYSIS_MODEL, messages, ANALYSIS_TEMPERATURE)
+        cached = self.llm_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompts.get(analysis_type, prompts["sentiment"])}],
-                temperature=0.1
+            response = await self.openai_client.chat.completions.create(
+                model=ANALYSIS_MODEL,
+                messages=messages,
+                temperature=ANALYSIS_TEMPERATURE,
+                response_format=_response_format("bundle", _object_schema({
+                    name: ANALYSIS_SCHEMAS[BUNDLE_SECTIONS[name][1]] for name in sections
+                }))
             )
-            return response.choices[0].message.content
+            analyses = json.loads(response.choices[0].message.content)
         except Exception as e:
-            return f"Error analyzing content: {e}"
+            return {"error": f"Error analyzing content: {e}"}
+        
+        self.llm_cache.put(cache_key, analyses)
+        return analyses
+    
+    async def analyze_sections(self, sections, company_name):
+        """Analyze {section: content} for a company, reusing its semantic cache hits and bundling the rest into one completion"""
+        prompts = {
+            name: _PROMPTS[BUNDLE_SECTIONS[name][1]].format(content=content)
+            for name, content in sections.items()
+        }
+        analyses = {}
+        misses = dict(sections)
+        
+        if CACHE_SETTINGS["enabled"]:
+            try:
+                # One embeddings round-trip for every section instead of one per section
+                vectors = await self._embed_many(list(prompts.values()))
+                for (name, prompt), vector in zip(prompts.items(), vectors):
+                    cache = self._semantic_cache(BUNDLE_SECTIONS[name][1])
+                    cache.add_embedding(prompt, vector)
+                    analysis = _load_analysis(await cache.get(
+                        prompt, ttl=CACHE_SETTINGS["time_sensitive_ttl_seconds"], scope=company_name
+                    ))
+                    if analysis is not None:
+                        analyses[name] = analysis
+                        del misses[name]
+            except Exception as e:
+                log.warning("Semantic cache lookup failed: %s", e)
+        
+        if misses:
+            bundle = await self.analyze_bundle(misses)
+            if "error" in bundle:
+                # The whole completion failed; report it against each section it covered
+                analyses.update((name, {"error": bundle["error"]}) for name in misses)
+                return analyses
+            analyses.update(bundle)
+            if CACHE_SETTINGS["enabled"]:
+                for name in misses:
+                    if name in bundle:
+                        cache = self._semantic_cache(BUNDLE_SECTIONS[name][1])
+                        await cache.put(prompts[name], json.dumps(bundle[name]), scope=company_name)
+        
+        return analyses
     
-    async def monitor_google_reviews(self, company_name, location=None):
+    async def _source_result(self, source, url, content, analysis_type, analyze=True, company_name=None):
+        """Build the report entry for one crawled page, analyzing it unless analyze is False"""
+        if isinstance(content, Exception):
+            content = f"Error crawling {url}: {content}"
+        if not _has_content(content):
+            return {"source": source, "error": content if content.startswith("Error") else "no_content"}
+        
+        result = {
+            "source": source,
+            "url": url,
+            "raw_content": content[:500] + "..." if len(content) > 500 else content
+        }
+        if analyze:
+            result["analysis"] = await self.analyze_content_with_ai(content, analysis_type, company_name)
+        else:
+            # Full text, for the caller to analyze together with other sources
+            result["content"] = content
+        return result
+    
+    async def _monitor_urls(self, urls, analysis_type, analyze=True, company_name=None):
+        """Crawl and analyze every URL concurrently, returning one result per URL in order"""
+        async def crawl_and_analyze(url):
+            # Each page is analyzed as soon as its own crawl lands
+            content = await self.crawl_website(url)
+            return await self._source_result(
+                urlparse(url).netloc, url, content, analysis_type, analyze, company_name
+            )
+        
+        return list(await asyncio.gather(*[crawl_and_analyze(url) for url in urls]))
+    
+    async def monitor_google_reviews(self, company_name, location=None, analyze=True):
         """Monitor Google Reviews for a company"""
-        print(f"Monitoring Google Reviews for {company_name}...")
+        log.info("Monitoring Google Reviews for %s...", company_name)
         
         # Construct Google search URL for reviews
         search_query = f"{company_name} reviews"
         if location:
             search_query += f" {location}"
         
-        google_url = f"https://www.google.com/search?q={search_query.replace(' ', '+')}"
+        google_url = f"https://www.google.com/search?q={quote_plus(search_query)}"
         
-        # Extract rules for Google reviews
+        # Extract rules for Google reviews: only the review snippets themselves
         extraction_rules = {
-            "extract": "text",
-            "includeTags": ["div", "span", "p"],
-            "excludeTags": ["script", "style", "nav", "footer"],
-            "selectors": [".review-dialog", ".review-snippet", ".review-text"]
+            "onlyMainContent": True,
+            "formats": ["markdown"],
+            "selectors": [".review-snippet", ".review-text"],
+            "maxChars": MAX_CRAWL_CHARS
         }
         
         content = await self.crawl_website(google_url, extraction_rules)
-        if content and not content.startswith("Error"):
-            analysis = self.analyze_content_with_ai(content, "reviews")
-            return {
-                "source": "Google Reviews",
-                "url": google_url,
-                "raw_content": content[:500] + "..." if len(content) > 500 else content,
-                "analysis": analysis
-            }
-        else:
-            return {"source": "Google Reviews", "error": content}
+        return await self._source_result(
+            "Google Reviews", google_url, content, "reviews", analyze, company_name
+        )
     
-    async def monitor_news_sources(self, company_name):
+    async def monitor_news_sources(self, company_name, analyze=True, enc=None):
         """Monitor news sources for company mentions"""
-        print(f"Monitoring news sources for {company_name}...")
+        log.info("Monitoring news sources for %s...", company_name)
+        enc = enc or encode_company_name(company_name)
         
         news_sources = [
-            f"https://www.google.com/news/search?q={company_name.replace(' ', '+')}",
-            f"https://finance.yahoo.com/quote/{company_name.replace(' ', '')}",
-            f"https://www.reuters.com/search/news?blob={company_name.replace(' ', '+')}"
+            f"https://www.google.com/news/search?q={enc['q']}",
+            f"https://finance.yahoo.com/quote/{enc['compact']}",
+            f"https://www.reuters.com/search/news?blob={enc['q']}"
         ]
         
-        results = []
-        for url in news_sources:
-            content = await self.crawl_website(url)
-            if content and not content.startswith("Error"):
-                analysis = self.analyze_content_with_ai(content, "news")
-                results.append({
-                    "source": url.split("//")[1].split("/")[0],
-                    "url": url,
-                    "raw_content": content[:500] + "..." if len(content) > 500 else content,
-                    "analysis": analysis
-                })
-            else:
-                results.append({"source": url.split("//")[1].split("/")[0], "error": content})
-        
-        return results
+        return await self._monitor_urls(news_sources, "news", analyze, company_name)
     
-    async def monitor_social_media(self, company_name):
+    async def monitor_social_media(self, company_name, analyze=True, enc=None):
         """Monitor social media mentions"""
-        print(f"Monitoring social media for {company_name}...")
+        log.info("Monitoring social media for %s...", company_name)
+        enc = enc or encode_company_name(company_name)
         
         # Note: Most social media sites have anti-scraping measures
         # This is a simplified approach
         social_urls = [
-            f"https://twitter.com/search?q={company_name.replace(' ', '%20')}",
-            f"https://www.linkedin.com/search/results/companies/?keywords={company_name.replace(' ', '%20')}"
+            f"https://twitter.com/search?q={enc['path']}",
+            f"https://www.linkedin.com/search/results/companies/?keywords={enc['path']}"
         ]
         
-        results = []
-        for url in social_urls:
-            content = await self.crawl_website(url)
-            if content and not content.startswith("Error"):
-                analysis = self.analyze_content_with_ai(content, "sentiment")
-                results.append({
-                    "source": url.split("//")[1].split("/")[0],
-                    "url": url,
-                    "raw_content": content[:500] + "..." if len(content) > 500 else content,
-                    "analysis": analysis
-                })
-            else:
-                results.append({"source": url.split("//")[1].split("/")[0], "error": content})
-        
-        return results
+        return await self._monitor_urls(social_urls, "sentiment", analyze, company_name)
     
-    async def monitor_company_website(self, company_name, website_url=None):
+    async def monitor_company_website(self, company_name, website_url=None, analyze=True, enc=None):
         """Monitor company's own website"""
-        print(f"Monitoring company website for {company_name}...")
+        log.info("Monitoring company website for %s...", company_name)
         
         if not website_url:
-            # Try to find company website
-            search_url = f"https://www.google.com/search?q={company_name.replace(' ', '+')}+official+website"
-            # This would need more sophisticated logic to extract the actual website URL
-            website_url = f"https://www.{company_name.lower().replace(' ', '')}.com"
+            # Guess the company website; finding the real one would need a search step
+            enc = enc or encode_company_name(company_name)
+            website_url = f"https://www.{enc['slug']}.com"
         
         content = await self.crawl_website(website_url)
-        if content and not content.startswith("Error"):
-            analysis = self.analyze_content_with_ai(content, "financial")
-            return {
-                "source": "Company Website",
-                "url": website_url,
-                "raw_content": content[:500] + "..." if len(content) > 500 else content,
-                "analysis": analysis
-            }
-        else:
-            return {"source": "Company Website", "error": content}
+        return await self._source_result(
+            "Company Website", website_url, content, "financial", analyze, company_name
+        )
     
     async def comprehensive_monitoring(self, company_name, location=None, website_url=None):
         """Comprehensive monitoring across all sources"""
-        print(f"Starting comprehensive monitoring for {company_name}...")
-        
-        # Run all monitoring tasks concurrently
-        tasks = [
-            self.monitor_google_reviews(company_name, location),
-            self.monitor_news_sources(company_name),
-            self.monitor_social_media(company_name),
-            self.monitor_company_website(company_name, website_url)
-        ]
+        log.info("Starting comprehensive monitoring for %s...", company_name)
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Crawl all sources concurrently; they are analyzed together below
+        enc = encode_company_name(company_name)
+        tasks = {
+            "google_reviews": asyncio.ensure_future(
+                self.monitor_google_reviews(company_name, location, analyze=False)
+            ),
+            "news_sources": asyncio.ensure_future(
+                self.monitor_news_sources(company_name, analyze=False, enc=enc)
+            ),
+            "social_media": asyncio.ensure_future(
+                self.monitor_social_media(company_name, analyze=False, enc=enc)
+            ),
+            "company_website": asyncio.ensure_future(
+                self.monitor_company_website(company_name, website_url, analyze=False, enc=enc)
+            )
+        }
+        
+        # One slow source must not hold up the whole report
+        try:
+            _, pending = await asyncio.wait(tasks.values(), timeout=MONITORING_TIMEOUT)
+        finally:
+            # Also reached when the caller cancels us, so no crawl is left running
+            for task in tasks.values():
+                task.cancel()
+        if pending:
+            log.warning("Timed out monitoring %d source(s) for %s", len(pending), company_name)
+            await asyncio.wait(pending)
+        
+        sources_monitored = {key: _task_outcome(task) for key, task in tasks.items()}
+        
+        # One completion covers every source instead of one per page
+        sections = {}
+        for section, (key, _, _) in BUNDLE_SECTIONS.items():
+            entries = sources_monitored[key]
+            if isinstance(entries, dict):
+                entries = [entries]
+            elif not isinstance(entries, list):
+                continue  # The whole source failed
+            texts = [entry.pop("content") for entry in entries if "content" in entry]
+            if texts:
+                sections[section] = "\n\n".join(text[:4000] for text in texts)
         
         # Compile comprehensive report
         monitoring_report = {
             "company_name": company_name,
             "monitoring_date": datetime.now().isoformat(),
-            "sources_monitored": {
-                "google_reviews": results[0],
-                "news_sources": results[1],
-                "social_media": results[2],
-                "company_website": results[3]
-            }
+            "sources_monitored": sources_monitored,
+            "source_analyses": await self.analyze_sections(sections, company_name) if sections else {}
         }
         
-        # Generate summary analysis
+        # Generate summary analysis from a compact digest; the full report is only saved to disk
         summary_prompt = f"""
         Based on the following monitoring data for {company_name}, provide a comprehensive lending assessment:
         
-        {json.dumps(monitoring_report, indent=2)}
+        {_summary_digest(sources_monitored, monitoring_report["source_analyses"])}
         
         Please provide:
         1. Overall company health assessment
@@ -283,8 +672,8 @@ class CompanyMonitoringAgent:
         """
         
         try:
-            summary_response = self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            summary_response = await self.openai_client.chat.completions.create(
+                model=ANALYSIS_MODEL,
                 messages=[{"role": "user", "content": summary_prompt}],
                 temperature=0.1
             )
@@ -299,12 +688,26 @@ class CompanyMonitoringAgent:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"monitoring_report_{company_name.replace(' ', '_')}_{timestamp}.json"
         
-        with open(filename, "w") as f:
-            json.dump(report, f, indent=2)
+        # Failed sources may hold exception objects; write them as text
+        with open(filename, "wb") as f:
+            f.write(orjson.dumps(report, default=str, option=orjson.OPT_INDENT_2))
         
         print(f"Monitoring report saved to: {filename}")
         return filename
 
+def configure_logging():
+    """Route log records through a queue so handler I/O happens off the event loop thread"""
+    log_queue = queue.Queue()
+    # QueueHandler formats records before queueing them, so the stream handler writes them as-is
+    listener = QueueListener(log_queue, logging.StreamHandler())
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "WARNING").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        handlers=[QueueHandler(log_queue)]
+    )
+    listener.start()
+    return listener
+
 async def main():
     """Main function to run company monitoring"""
     
@@ -319,6 +722,8 @@ async def main():
     print(f"Location: {LOCATION}")
     print("=" * 40)
     
+    listener = configure_logging()
+    agent = None
     try:
         # Initialize monitoring agent
         agent = CompanyMonitoringAgent()
@@ -338,9 +743,14 @@ async def main():
         
         # Save report
         agent.save_monitoring_report(report, COMPANY_NAME)
+        print(f"LLM cache: {agent.llm_cache.hits} hits, {agent.llm_cache.misses} misses")
         
     except Exception as e:
         print(f"Error: {e}")
+    finally:
+        if agent is not None:
+            await agent.aclose()
+        listener.stop()
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
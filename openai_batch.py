@@ -0,0 +1,103 @@
+"""
+OpenAI Batch API runner for AI Lending Research Agent
+
+Submits many chat-completion requests as a single batch job, which costs
+roughly half as much as individual requests and is not bound by the
+per-minute rate limits. Suitable for research that is not latency-sensitive.
+"""
+
+import asyncio
+import json
+
+# Batch statuses after which polling stops
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class OpenAIBatchRunner:
+    def __init__(self, client=None, model="gpt-4o", poll_interval=30, completion_window="24h"):
+        if client is None:
+            try:
+                from openai import AsyncOpenAI
+                client = AsyncOpenAI()
+            except ImportError:
+                raise ImportError("Please install openai: pip install openai")
+
+        self.client = client
+        self.model = model
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+
+    def build_request(self, custom_id, prompt, **options):
+        """Build one JSONL line for the batch input file; options are extra request body fields"""
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}],
+                **options
+            }
+        }
+
+    async def submit(self, requests):
+        """Upload the requests and create a batch job, returning its id"""
+        payload = "\n".join(json.dumps(request) for request in requests).encode()
+        batch_file = await self.client.files.create(
+            file=("batch_requests.jsonl", payload),
+            purpose="batch"
+        )
+        batch = await self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window
+        )
+        print(f"Submitted OpenAI batch {batch.id} with {len(requests)} requests")
+        return batch.id
+
+    async def wait(self, batch_id):
+        """Poll a batch job until it reaches a terminal status"""
+        while True:
+            batch = await self.client.batches.retrieve(batch_id)
+            if batch.status in TERMINAL_STATUSES:
+                return batch
+            await asyncio.sleep(self.poll_interval)
+
+    async def _read_records(self, file_id):
+        """Return the JSONL records of a batch output or error file"""
+        if not file_id:
+            return []
+        content = await self.client.files.content(file_id)
+        return [json.loads(line) for line in content.text.splitlines() if line.strip()]
+
+    async def collect(self, batch_id):
+        """Wait for a batch job and return {custom_id: response text or {"error": ...}}"""
+        batch = await self.wait(batch_id)
+        # Failed requests are listed in the error file; if every request failed
+        # there is no output file, and an expired batch may have partial output
+        if not batch.output_file_id and not batch.error_file_id:
+            raise RuntimeError(f"OpenAI batch {batch_id} finished with status {batch.status}")
+
+        records = await self._read_records(batch.output_file_id)
+        records += await self._read_records(batch.error_file_id)
+
+        results = {}
+        for item in records:
+            response = item.get("response") or {}
+            body = response.get("body") or {}
+            if item.get("error"):
+                results[item["custom_id"]] = {"error": str(item["error"])}
+            elif response.get("status_code") != 200:
+                error = body.get("error") or {}
+                message = error.get("message", error) if isinstance(error, dict) else error
+                results[item["custom_id"]] = {"error": f"HTTP {response.get('status_code')}: {message}"}
+            else:
+                results[item["custom_id"]] = body["choices"][0]["message"]["content"]
+
+        return results
+
+    async def run(self, prompts):
+        """Submit {custom_id: prompt} as one batch and return {custom_id: result}"""
+        requests = [self.build_request(custom_id, prompt) for custom_id, prompt in prompts.items()]
+        batch_id = await self.submit(requests)
+        return await self.collect(batch_id)
@@ -0,0 +1,124 @@
+"""
+Static source prefetching for AI Lending Research Agent
+
+Some research types send the browser agent to pages that are served as plain
+HTML/JSON (e.g. SEC EDGAR). Fetching those directly over HTTP and passing the
+extracted text to the LLM is much faster than driving Chromium to read them.
+"""
+
+import asyncio
+import re
+import aiohttp
+from bs4 import BeautifulSoup
+from config import SEC_SETTINGS
+
+SEC_TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
+SEC_SUBMISSIONS_URL = "https://data.sec.gov/submissions/CIK{cik:010d}.json"
+SEC_ARCHIVE_URL = "https://www.sec.gov/Archives/edgar/data/{cik}/{accession}/{document}"
+
+# "Item 1A. Risk Factors" up to the next item heading
+RISK_FACTORS_PATTERN = re.compile(
+    r"item\s*1a\.?\s*risk\s+factors(.*?)item\s*(?:1b|1c|2)\.?\s",
+    re.IGNORECASE | re.DOTALL
+)
+
+_COMPANY_SUFFIXES = re.compile(r"[\s,.]+(inc|corp|corporation|co|company|ltd|plc|llc)\.?$", re.IGNORECASE)
+
+
+def html_to_text(html):
+    """Extract readable text from an HTML document"""
+    return BeautifulSoup(html, "html.parser").get_text(" ", strip=True)
+
+
+async def fetch_text(session, url):
+    """Fetch a page and return its visible text"""
+    async with session.get(url) as response:
+        response.raise_for_status()
+        html = await response.text()
+    # Parsing large filings is CPU-bound, keep it off the event loop
+    return await asyncio.get_running_loop().run_in_executor(None, html_to_text, html)
+
+
+async def fetch_json(session, url):
+    """Fetch a JSON document"""
+    async with session.get(url) as response:
+        response.raise_for_status()
+        return await response.json(content_type=None)
+
+
+def normalize_company_name(name):
+    """Lowercase a company name and strip common legal suffixes"""
+    return _COMPANY_SUFFIXES.sub("", name.strip()).lower()
+
+
+async def find_cik(session, company_name):
+    """Look up a company's SEC CIK by ticker or registered name"""
+    tickers = await fetch_json(session, SEC_TICKERS_URL)
+    target = normalize_company_name(company_name)
+
+    for entry in tickers.values():
+        if entry["ticker"].lower() == target or normalize_company_name(entry["title"]) == target:
+            return int(entry["cik_str"])
+
+    # Fall back to a prefix match ("Apple" -> "Apple Inc.")
+    for entry in tickers.values():
+        if normalize_company_name(entry["title"]).startswith(target):
+            return int(entry["cik_str"])
+
+    return None
+
+
+def extract_risk_factors(text):
+    """Return the longest "Risk Factors" section (skipping the table of contents)"""
+    sections = [match.group(1).strip() for match in RISK_FACTORS_PATTERN.finditer(text)]
+    return max(sections, key=len) if sections else None
+
+
+async def prefetch_sec_filing(session, company_name):
+    """Fetch the Risk Factors section of a company's latest 10-K"""
+    cik = await find_cik(session, company_name)
+    if cik is None:
+        return None
+
+    submissions = await fetch_json(session, SEC_SUBMISSIONS_URL.format(cik=cik))
+    recent = submissions["filings"]["recent"]
+    for form, accession, document, filing_date in zip(
+        recent["form"], recent["accessionNumber"], recent["primaryDocument"], recent["filingDate"]
+    ):
+        if form == "10-K":
+            break
+    else:
+        return None
+
+    filing_url = SEC_ARCHIVE_URL.format(cik=cik, accession=accession.replace("-", ""), document=document)
+    risk_factors = extract_risk_factors(await fetch_text(session, filing_url))
+    if not risk_factors:
+        return None
+
+    return (
+        f"Latest 10-K for {submissions.get('name', company_name)} filed {filing_date}\n"
+        f"URL: {filing_url}\n\n"
+        f"RISK FACTORS:\n{risk_factors[:SEC_SETTINGS['max_source_chars']]}"
+    )
+
+
+# Research types whose source pages can be fetched without a browser
+PREFETCHERS = {
+    "sec": prefetch_sec_filing
+}
+
+
+def create_session():
+    """Create an HTTP session suitable for SEC fair-access requirements"""
+    return aiohttp.ClientSession(
+        headers={"User-Agent": SEC_SETTINGS["user_agent"]},
+        timeout=aiohttp.ClientTimeout(total=SEC_SETTINGS["timeout"])
+    )
+
+
+async def prefetch_source(session, research_type, company_name):
+    """Return extracted source text for research_type, or None if unavailable"""
+    prefetcher = PREFETCHERS.get(research_type)
+    if prefetcher is None:
+        return None
+    return await prefetcher(session, company_name)
@@ -0,0 +1,81 @@
+"""
+Rate limiting for AI Lending Research Agent
+
+Token-bucket limiter that paces calls to stay just under a provider's
+requests-per-minute and tokens-per-minute limits, instead of sleeping a
+fixed amount between requests.
+"""
+
+import asyncio
+import time
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+def estimate_tokens(text):
+    """Rough token estimate for a prompt (about 4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    return tiktoken.encoding_for_model(model)
+
+
+def count_tokens(text, model="gpt-4o-mini"):
+    """Exact token count for text under model's tokenizer, or estimate_tokens without tiktoken"""
+    if tiktoken is None:
+        return estimate_tokens(text)
+    return len(_encoding(model).encode(text))
+
+
+class AsyncRateLimiter:
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.available_requests = float(requests_per_minute)
+        self.available_tokens = float(tokens_per_minute)
+        self.last_refill = time.monotonic()
+        self._lock = None
+
+    def _refill(self):
+        """Top up both buckets in proportion to the time since the last refill"""
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        self.available_requests = min(
+            self.requests_per_minute,
+            self.available_requests + elapsed * self.requests_per_minute / 60
+        )
+        self.available_tokens = min(
+            self.tokens_per_minute,
+            self.available_tokens + elapsed * self.tokens_per_minute / 60
+        )
+
+    async def acquire(self, tokens=0, requests=1):
+        """Wait until the buckets can cover the given requests and tokens, then take them"""
+        # Never ask for more than a full bucket, or we would wait forever
+        tokens = min(tokens, self.tokens_per_minute)
+        requests = min(requests, self.requests_per_minute)
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        # Callers queue on the lock, so capacity is handed out in arrival order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.available_requests >= requests and self.available_tokens >= tokens:
+                    self.available_requests -= requests
+                    self.available_tokens -= tokens
+                    return
+
+                wait = max(
+                    (requests - self.available_requests) * 60 / self.requests_per_minute,
+                    (tokens - self.available_tokens) * 60 / self.tokens_per_minute
+                )
+                await asyncio.sleep(max(wait, 0.01))
@@ -5,86 +5,53 @@ Setup script for Firecrawl MCP Server
 This script helps set up the Firecrawl MCP server for the company monitoring agent.
 """
 
-import subprocess
+import asyncio
 import sys
 import os
 import json
 from pathlib import Path
 
-def run_command(command, description):
-    """Run a command and handle errors"""
+FIRECRAWL_REPO = "https://github.com/mendableai/firecrawl-mcp-server.git"
+
+async def run_command(args, description, cwd=None):
+    """Run a command without a shell, streaming its output, and return whether it succeeded"""
     print(f"\n{description}...")
     try:
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
-        print(f"✓ {description} completed successfully")
-        return result.stdout
-    except subprocess.CalledProcessError as e:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            cwd=cwd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT
+        )
+    except FileNotFoundError as e:
         print(f"✗ Error during {description}: {e}")
-        print(f"Error output: {e.stderr}")
-        return None
-
-def check_node_installed():
-    """Check if Node.js is installed"""
-    try:
-        result = subprocess.run(["node", "--version"], capture_output=True, text=True)
-        if result.returncode == 0:
-            print(f"✓ Node.js is installed: {result.stdout.strip()}")
-            return True
-        else:
-            return False
-    except FileNotFoundError:
         return False
-
-def check_npm_installed():
-    """Check if npm is installed"""
-    try:
-        result = subprocess.run(["npm", "--version"], capture_output=True, text=True)
-        if result.returncode == 0:
-            print(f"✓ npm is installed: {result.stdout.strip()}")
-            return True
-        else:
-            return False
-    except FileNotFoundError:
-        return False
-
-def install_firecrawl():
-    """Install Firecrawl MCP server"""
-    print("\n" + "="*50)
-    print("SETTING UP FIRECRAWL MCP SERVER")
-    print("="*50)
     
-    # Check prerequisites
-    if not check_node_installed():
-        print("✗ Node.js is not installed. Please install Node.js first:")
-        print("  Visit: https://nodejs.org/")
-        return False
+    # Show progress as it happens; npm install in particular can take minutes
+    async for line in process.stdout:
+        print(f"  {line.decode(errors='replace').rstrip()}")
     
-    if not check_npm_installed():
-        print("✗ npm is not installed. Please install npm first.")
+    if await process.wait() != 0:
+        print(f"✗ Error during {description}: exit code {process.returncode}")
         return False
-    
-    # Create firecrawl directory
-    firecrawl_dir = Path("firecrawl-mcp-server")
-    if not firecrawl_dir.exists():
-        print(f"\nCloning Firecrawl MCP server to {firecrawl_dir}...")
-        result = run_command(
-            "git clone https://github.com/mendableai/firecrawl-mcp-server.git",
-            "Cloning Firecrawl repository"
+    print(f"✓ {description} completed successfully")
+    return True
+
+async def get_version(command):
+    """Return the output of `command --version`, or None if it is not installed"""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            command, "--version",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
         )
-        if not result:
-            return False
-    else:
-        print(f"✓ Firecrawl directory already exists: {firecrawl_dir}")
-    
-    # Navigate to firecrawl directory
-    os.chdir(firecrawl_dir)
-    
-    # Install dependencies
-    result = run_command("npm install", "Installing npm dependencies")
-    if not result:
-        return False
-    
-    # Create configuration file
+    except FileNotFoundError:
+        return None
+    stdout, _ = await process.communicate()
+    return stdout.decode().strip() if process.returncode == 0 else None
+
+def write_server_files(firecrawl_dir):
+    """Write the server configuration and startup script into firecrawl_dir"""
     config = {
         "port": 3000,
         "host": "localhost",
@@ -95,7 +62,7 @@ def install_firecrawl():
         }
     }
     
-    config_file = Path("config.json")
+    config_file = firecrawl_dir / "config.json"
     with open(config_file, "w") as f:
         json.dump(config, f, indent=2)
     
@@ -112,18 +79,53 @@ echo "Server will be available at: http://localhost:3000"
 npm start
 """
     
-    with open("start_server.sh", "w") as f:
+    script_file = firecrawl_dir / "start_server.sh"
+    with open(script_file, "w") as f:
         f.write(startup_script)
     
     # Make startup script executable
-    os.chmod("start_server.sh", 0o755)
+    os.chmod(script_file, 0o755)
     
-    print("✓ Startup script created: start_server.sh")
+    print(f"✓ Startup script created: {script_file}")
+
+async def install_firecrawl():
+    """Install Firecrawl MCP server"""
+    print("\n" + "="*50)
+    print("SETTING UP FIRECRAWL MCP SERVER")
+    print("="*50)
     
-    # Go back to original directory
-    os.chdir("..")
+    # Check prerequisites
+    node_version, npm_version = await asyncio.gather(get_version("node"), get_version("npm"))
+    if not node_version:
+        print("✗ Node.js is not installed. Please install Node.js first:")
+        print("  Visit: https://nodejs.org/")
+        return False
+    print(f"✓ Node.js is installed: {node_version}")
     
-    return True
+    if not npm_version:
+        print("✗ npm is not installed. Please install npm first.")
+        return False
+    print(f"✓ npm is installed: {npm_version}")
+    
+    # Clone into firecrawl directory
+    firecrawl_dir = Path("firecrawl-mcp-server")
+    if not firecrawl_dir.exists():
+        print(f"\nCloning Firecrawl MCP server to {firecrawl_dir}...")
+        if not await run_command(
+            ["git", "clone", FIRECRAWL_REPO, str(firecrawl_dir)],
+            "Cloning Firecrawl repository"
+        ):
+            return False
+    else:
+        print(f"✓ Firecrawl directory already exists: {firecrawl_dir}")
+    
+    # Install dependencies while the local files are written; cwd= keeps the
+    # process working directory untouched
+    installed, _ = await asyncio.gather(
+        run_command(["npm", "install"], "Installing npm dependencies", cwd=firecrawl_dir),
+        asyncio.get_running_loop().run_in_executor(None, write_server_files, firecrawl_dir)
+    )
+    return installed
 
 def create_test_script():
     """Create a test script to verify Firecrawl is working"""
@@ -233,7 +235,7 @@ def main():
     print("="*30)
     
     # Install Firecrawl
-    if not install_firecrawl():
+    if not asyncio.run(install_firecrawl()):
         print("\n✗ Setup failed. Please check the errors above.")
         return
     
@@ -6,221 +6,689 @@ A simplified version that avoids compatibility issues with browser-use
 and focuses on core lending research functionality.
 """
 
+import argparse
 import asyncio
 import json
 import time
 import os
+import threading
+import weakref
 from datetime import datetime
+from functools import lru_cache
+from string import Formatter
+import httpx
 from dotenv import load_dotenv
+from openai import APIConnectionError, APIError, InternalServerError, RateLimitError
+from tenacity import retry, stop_after_attempt, wait_random_exponential, retry_if_exception_type
+from llm_cache import LLMCache, PromptCache
+from openai_batch import OpenAIBatchRunner
+from rate_limiter import AsyncRateLimiter, count_tokens
+from config import CACHE_SETTINGS, SCRAPING_SETTINGS
 
 # Load environment variables
 load_dotenv()
 
+# Model and temperature for every research prompt
+MODEL = "gpt-4o-mini"  # Cheaper and faster per token
+TEMPERATURE = 0.1
+
+# Output cap per research type, sized to its schema; the multi-section
+# comprehensive assessment needs the most room
+MAX_OUTPUT_TOKENS = {
+    "financials": 1200,
+    "news": 1200,
+    "industry": 1200,
+    "comprehensive": 2000
+}
+
+# gpt-4o-mini's context window, and headroom left for chat formatting tokens
+CONTEXT_WINDOW = 128000
+TOKEN_MARGIN = 128
+
+# Companies packed into one request by comprehensive_risk_assessment_batch
+BATCH_SIZE = 5
+
+# Research prompts, filled in per call
+FINANCIALS_PROMPT = """
+Research the financial health of {company} for lending purposes.
+
+Please provide:
+1. Key financial metrics (revenue, profit, debt levels, cash flow)
+2. Recent financial performance trends
+3. Creditworthiness indicators
+4. Risk factors
+5. Overall lending risk assessment (Low/Medium/High)
+
+Format your response as structured data that a lender would find useful.
+"""
+
+NEWS_PROMPT = """
+Analyze recent news and sentiment for {company} from a lending perspective.
+
+Please provide:
+1. Recent significant news (last 3 months)
+2. Overall sentiment analysis (positive/negative/neutral)
+3. Any news that could impact creditworthiness
+4. Industry trends affecting the company
+5. Risk implications for lenders
+
+Focus on information that would be relevant for lending decisions.
+"""
+
+INDUSTRY_PROMPT = """
+Provide an industry overview for {industry} from a lending perspective.
+
+Please include:
+1. Current market conditions
+2. Growth trends and forecasts
+3. Key risks and challenges
+4. Regulatory environment
+5. Competitive landscape
+6. Implications for lending decisions
+
+Focus on factors that would affect credit risk assessment.
+"""
+
+RISK_PROMPT = """
+Conduct a comprehensive lending risk assessment for {company}.
+{industry_line}
+
+Please provide a structured assessment including:
+
+1. FINANCIAL RISK ASSESSMENT:
+   - Cash flow analysis
+   - Debt levels and coverage
+   - Profitability trends
+   - Asset quality
+
+2. BUSINESS RISK ASSESSMENT:
+   - Market position
+   - Competitive advantages
+   - Business model sustainability
+   - Management quality
+
+3. INDUSTRY RISK ASSESSMENT:
+   - Market conditions
+   - Regulatory environment
+   - Technology disruption risks
+   - Economic sensitivity
+
+4. OVERALL RISK RATING:
+   - Overall risk level (Low/Medium/High)
+   - Key risk factors
+   - Mitigating factors
+   - Recommended lending terms
+
+5. MONITORING RECOMMENDATIONS:
+   - Key metrics to track
+   - Warning signs to watch
+   - Review frequency
+
+Format as a professional lending assessment report.
+"""
+
+BATCH_RISK_PROMPT = """
+Conduct a lending risk assessment for each company below.
+
+Respond with a JSON object keyed by company name exactly as listed. Each value
+is an object with the fields: financial_risk, business_risk, industry_risk,
+overall_rating (Low/Medium/High), key_risk_factors, mitigating_factors,
+recommended_terms, monitoring_recommendations.
+
+Companies:
+{listing}
+"""
+
+def _object_schema(properties):
+    """JSON schema for an object with exactly these properties, as strict structured outputs expect"""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+_TEXT = {"type": "string"}
+_TEXT_LIST = {"type": "array", "items": {"type": "string"}}
+_RISK_LEVEL = {"type": "string", "enum": ["Low", "Medium", "High"]}
+
+# Structured output for each research type, one field per item its prompt asks for
+FINANCIALS_SCHEMA = _object_schema({
+    "key_metrics": _object_schema({"revenue": _TEXT, "profit": _TEXT, "debt_levels": _TEXT, "cash_flow": _TEXT}),
+    "performance_trends": _TEXT_LIST,
+    "creditworthiness_indicators": _TEXT_LIST,
+    "risk_factors": _TEXT_LIST,
+    "overall_rating": _RISK_LEVEL
+})
+
+NEWS_SCHEMA = _object_schema({
+    "recent_news": _TEXT_LIST,
+    "sentiment": {"type": "string", "enum": ["positive", "negative", "neutral"]},
+    "creditworthiness_news": _TEXT_LIST,
+    "industry_trends": _TEXT_LIST,
+    "lender_risk_implications": _TEXT_LIST
+})
+
+INDUSTRY_SCHEMA = _object_schema({
+    "market_conditions": _TEXT,
+    "growth_trends": _TEXT_LIST,
+    "key_risks": _TEXT_LIST,
+    "regulatory_environment": _TEXT,
+    "competitive_landscape": _TEXT,
+    "lending_implications": _TEXT_LIST
+})
+
+RISK_SCHEMA = _object_schema({
+    "financial": _object_schema({
+        "cash_flow": _TEXT, "debt_coverage": _TEXT, "profitability": _TEXT, "asset_quality": _TEXT
+    }),
+    "business": _object_schema({
+        "market_position": _TEXT, "competitive_advantages": _TEXT,
+        "business_model": _TEXT, "management_quality": _TEXT
+    }),
+    "industry": _object_schema({
+        "market_conditions": _TEXT, "regulatory_environment": _TEXT,
+        "disruption_risks": _TEXT, "economic_sensitivity": _TEXT
+    }),
+    "overall_rating": _RISK_LEVEL,
+    "key_risk_factors": _TEXT_LIST,
+    "mitigating_factors": _TEXT_LIST,
+    "recommended_terms": _TEXT,
+    "monitoring": _object_schema({
+        "key_metrics": _TEXT_LIST, "warning_signs": _TEXT_LIST, "review_frequency": _TEXT
+    })
+})
+
+RESEARCH_SCHEMAS = {
+    "financials": FINANCIALS_SCHEMA,
+    "news": NEWS_SCHEMA,
+    "industry": INDUSTRY_SCHEMA,
+    "comprehensive": RISK_SCHEMA
+}
+
+@lru_cache(maxsize=None)
+def _template_tokens(template):
+    """Token count of a prompt template's fixed text, counted once per template"""
+    return count_tokens("".join(literal for literal, *_ in Formatter().parse(template)), MODEL)
+
+def _prompt_tokens(template, **fields):
+    """Token count of template filled with fields, tokenizing only the substituted values"""
+    return _template_tokens(template) + sum(count_tokens(str(value), MODEL) for value in fields.values())
+
+def _research_prompt(research_type, company, industry=None):
+    """Return the prompt for a research type and its token count"""
+    if research_type == "industry":
+        template, fields = INDUSTRY_PROMPT, {"industry": industry or "technology"}
+    elif research_type == "comprehensive":
+        template = RISK_PROMPT
+        fields = {"company": company, "industry_line": f"Industry: {industry}" if industry else ""}
+    else:
+        template = FINANCIALS_PROMPT if research_type == "financials" else NEWS_PROMPT
+        fields = {"company": company}
+    return template.format(**fields), _prompt_tokens(template, **fields)
+
+def _response_format(research_type):
+    """Structured-output format that constrains a reply to the research type's schema"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": research_type, "schema": RESEARCH_SCHEMAS[research_type], "strict": True}
+    }
+
+def _load_result(cached):
+    """Parse a result from the semantic cache, which stores text; prose results predate JSON output"""
+    if cached is None:
+        return None
+    try:
+        return json.loads(cached)
+    except ValueError:
+        return None
+
+# Example values from the setup docs that are not real API keys
+_PLACEHOLDERS = frozenset({
+    "",
+    "your_openai_api_key_here",
+    "your_actual_openai_api_key_here",
+    "sk-...",
+    "PASTE_KEY_HERE"
+})
+
+# Transient API failures worth retrying (APIConnectionError includes timeouts);
+# anything else is a real error and propagates to the caller
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+class TruncatedOutputError(ValueError):
+    """A completion stopped at its output cap, so its JSON is incomplete"""
+
+# Closes a report opened with open_report
+REPORT_END = "\n}\n"
+
+# Research type -> call on an agent for (company, industry)
+DISPATCH = {
+    "financials": lambda agent, company, industry, **kwargs: agent.research_company_financials(company, **kwargs),
+    "news": lambda agent, company, industry, **kwargs: agent.research_news_sentiment(company, **kwargs),
+    "industry": lambda agent, company, industry, **kwargs: agent.research_industry_overview(industry or "technology", **kwargs),
+    "comprehensive": lambda agent, company, industry, **kwargs: agent.comprehensive_risk_assessment(company, industry, **kwargs)
+}
+
+def _write_file(filename, data):
+    with open(filename, "wb") as f:
+        f.write(data)
+
 class SimpleLendingResearchAgent:
-    def __init__(self, api_key=None):
-        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        if not self.api_key or self.api_key == "your_openai_api_key_here":
-            raise ValueError("Please set your OpenAI API key in the .env file")
-        
-        # Import OpenAI client directly to avoid compatibility issues
-        try:
-            from openai import OpenAI
-            self.client = OpenAI(api_key=self.api_key)
-        except ImportError:
-            raise ImportError("Please install openai: pip install openai")
+    # Shared OpenAI clients, {event loop: {api_key: (client, http pool)}}; async
+    # connections can't outlive the loop that opened them
+    _clients = weakref.WeakKeyDictionary()
+    _clients_lock = threading.Lock()
     
-    def research_company_financials(self, company_name):
-        """Research company financial information"""
-        prompt = f"""
-        Research the financial health of {company_name} for lending purposes.
+    def __init__(self, api_key=None, limiter=None):
+        # Reject placeholder and malformed keys here rather than with a failed request
+        self.api_key = (api_key or os.getenv("OPENAI_API_KEY") or "").strip()
+        if self.api_key in _PLACEHOLDERS or not self.api_key.startswith("sk-"):
+            raise ValueError("Please set your OpenAI API key (it starts with \"sk-\") in the .env file")
         
-        Please provide:
-        1. Key financial metrics (revenue, profit, debt levels, cash flow)
-        2. Recent financial performance trends
-        3. Creditworthiness indicators
-        4. Risk factors
-        5. Overall lending risk assessment (Low/Medium/High)
+        # Paces calls to stay under the provider's request and token budgets; pass
+        # a shared limiter when several agents use the same API key
+        self.limiter = limiter or AsyncRateLimiter(
+            SCRAPING_SETTINGS["requests_per_minute"],
+            SCRAPING_SETTINGS["tokens_per_minute"]
+        )
+        self._semaphore = None
         
-        Format your response as structured data that a lender would find useful.
-        """
+        # Identical prompts are answered from disk; at temperature 0.1 the
+        # completions are near-deterministic
+        self.llm_cache = LLMCache(max_temperature=TEMPERATURE)
         
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",  # Using cheaper model
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1
+        # Near-identical research prompts reuse an earlier answer
+        self.prompt_cache = None
+        if CACHE_SETTINGS["enabled"]:
+            root, ext = os.path.splitext(CACHE_SETTINGS["path"])
+            self.prompt_cache = PromptCache(
+                path=f"{root}_simple{ext}",
+                embed=self._embed,
+                similarity_threshold=CACHE_SETTINGS["similarity_threshold"]
             )
-            return response.choices[0].message.content
-        except Exception as e:
-            return f"Error researching financials: {e}"
     
-    def research_news_sentiment(self, company_name):
-        """Research recent news and sentiment"""
-        prompt = f"""
-        Analyze recent news and sentiment for {company_name} from a lending perspective.
+    @property
+    def client(self):
+        """The OpenAI client shared by every agent with this API key on the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._clients_lock:
+            clients = self._clients.setdefault(loop, {})
+            if self.api_key not in clients:
+                # Import OpenAI client directly to avoid compatibility issues
+                try:
+                    from openai import AsyncOpenAI
+                except ImportError:
+                    raise ImportError("Please install openai: pip install openai")
+                
+                # One keep-alive HTTP/2 connection pool serves every request, so concurrent
+                # research calls are multiplexed instead of each opening a connection
+                http = httpx.AsyncClient(
+                    http2=True,
+                    timeout=60.0,
+                    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+                )
+                clients[self.api_key] = (AsyncOpenAI(api_key=self.api_key, http_client=http), http)
+            return clients[self.api_key][0]
+    
+    @classmethod
+    async def aclose_clients(cls):
+        """Close the shared OpenAI clients and connection pools of the running event loop"""
+        with cls._clients_lock:
+            clients = cls._clients.pop(asyncio.get_running_loop(), {})
+        for client, http in clients.values():
+            await client.close()
+            await http.aclose()
+    
+    async def aclose(self):
+        """Close the prompt cache; the shared client stays open until aclose_clients()"""
+        if self.prompt_cache is not None:
+            self.prompt_cache.close()
+            self.prompt_cache = None
+    
+    async def _embed(self, text):
+        """Embed text with the agent's OpenAI client"""
+        response = await self.client.embeddings.create(
+            model="text-embedding-3-small",
+            input=text
+        )
+        return response.data[0].embedding
+    
+    @retry(
+        stop=stop_after_attempt(SCRAPING_SETTINGS["max_retries"]),
+        wait=wait_random_exponential(min=1, max=60),
+        retry=retry_if_exception_type(RETRYABLE_ERRORS),
+        reraise=True
+    )
+    async def _call_llm(self, messages, max_tokens, prompt_tokens=None, **kwargs):
+        """Create a chat completion within the rate limits, retrying transient failures with backoff"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(SCRAPING_SETTINGS["global_max_concurrency"])
         
-        Please provide:
-        1. Recent significant news (last 3 months)
-        2. Overall sentiment analysis (positive/negative/neutral)
-        3. Any news that could impact creditworthiness
-        4. Industry trends affecting the company
-        5. Risk implications for lenders
+        if prompt_tokens is None:
+            prompt_tokens = sum(count_tokens(message["content"], MODEL) for message in messages)
+        # Fail before the request when the prompt leaves no room for the capped reply
+        if prompt_tokens + max_tokens + TOKEN_MARGIN > CONTEXT_WINDOW:
+            raise ValueError(f"Prompt of {prompt_tokens} tokens leaves no room for a {max_tokens}-token reply")
+        async with self._semaphore:
+            await self.limiter.acquire(prompt_tokens + max_tokens)
+            return await self.client.chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                temperature=TEMPERATURE,
+                max_tokens=max_tokens,
+                **kwargs
+            )
+    
+    async def _cached_completion(self, prompt, research_type, subject, on_delta=None, prompt_tokens=None):
+        """Return the JSON result for prompt as a dict, from the exact or semantic cache when possible
         
-        Focus on information that would be relevant for lending decisions.
+        Semantic matches are limited to earlier results for the same research type and
+        subject (company or industry), since the prompts differ only in that name.
+        With on_delta, the completion is streamed and on_delta is called with each
+        piece of JSON text as it arrives (a cached result arrives as a single piece).
         """
+        messages = [{"role": "user", "content": prompt}]
+        cache_key = self.llm_cache.cache_key(MODEL, messages, TEMPERATURE)
+        result = self.llm_cache.get(cache_key)
+        if result is not None:
+            if on_delta:
+                on_delta(json.dumps(result))
+            return result
         
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",  # Using cheaper model
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            return f"Error researching news: {e}"
+        if research_type in CACHE_SETTINGS["time_sensitive_research_types"]:
+            ttl = CACHE_SETTINGS["time_sensitive_ttl_seconds"]
+        else:
+            ttl = CACHE_SETTINGS["ttl_seconds"]
+        scope = f"{research_type}:{subject}"
+        
+        if self.prompt_cache:
+            result = _load_result(await self.prompt_cache.get(prompt, ttl=ttl, scope=scope))
+            if result is not None:
+                self.llm_cache.put(cache_key, result)
+                if on_delta:
+                    on_delta(json.dumps(result))
+                return result
+        
+        max_tokens = MAX_OUTPUT_TOKENS[research_type]
+        options = {
+            "max_tokens": max_tokens,
+            "prompt_tokens": prompt_tokens,
+            "response_format": _response_format(research_type)
+        }
+        if on_delta:
+            parts = []
+            finish_reason = None
+            async for chunk in await self._call_llm(messages, stream=True, **options):
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    on_delta(delta)
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+            content = "".join(parts)
+        else:
+            response = await self._call_llm(messages, **options)
+            content = response.choices[0].message.content
+            finish_reason = response.choices[0].finish_reason
+        if finish_reason == "length":
+            raise TruncatedOutputError(f"{research_type} research was cut off at {max_tokens} output tokens")
+        result = json.loads(content)
+        
+        if self.prompt_cache:
+            await self.prompt_cache.put(prompt, content, scope=scope)
+        
+        self.llm_cache.put(cache_key, result)
+        return result
     
-    def research_industry_overview(self, industry_name):
+    async def research_company_financials(self, company_name, on_delta=None):
+        """Research company financial information"""
+        prompt, prompt_tokens = _research_prompt("financials", company_name)
+        return await self._cached_completion(prompt, "financials", company_name, on_delta, prompt_tokens)
+    
+    async def research_news_sentiment(self, company_name, on_delta=None):
+        """Research recent news and sentiment"""
+        prompt, prompt_tokens = _research_prompt("news", company_name)
+        return await self._cached_completion(prompt, "news", company_name, on_delta, prompt_tokens)
+    
+    async def research_industry_overview(self, industry_name, on_delta=None):
         """Research industry trends and outlook"""
-        prompt = f"""
-        Provide an industry overview for {industry_name} from a lending perspective.
-        
-        Please include:
-        1. Current market conditions
-        2. Growth trends and forecasts
-        3. Key risks and challenges
-        4. Regulatory environment
-        5. Competitive landscape
-        6. Implications for lending decisions
-        
-        Focus on factors that would affect credit risk assessment.
-        """
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",  # Using cheaper model
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            return f"Error researching industry: {e}"
+        prompt, prompt_tokens = _research_prompt("industry", None, industry_name)
+        return await self._cached_completion(prompt, "industry", industry_name, on_delta, prompt_tokens)
     
-    def comprehensive_risk_assessment(self, company_name, industry=None):
+    async def comprehensive_risk_assessment(self, company_name, industry=None, on_delta=None):
         """Comprehensive lending risk assessment"""
-        prompt = f"""
-        Conduct a comprehensive lending risk assessment for {company_name}.
-        {f'Industry: {industry}' if industry else ''}
-        
-        Please provide a structured assessment including:
-        
-        1. FINANCIAL RISK ASSESSMENT:
-           - Cash flow analysis
-           - Debt levels and coverage
-           - Profitability trends
-           - Asset quality
-        
-        2. BUSINESS RISK ASSESSMENT:
-           - Market position
-           - Competitive advantages
-           - Business model sustainability
-           - Management quality
-        
-        3. INDUSTRY RISK ASSESSMENT:
-           - Market conditions
-           - Regulatory environment
-           - Technology disruption risks
-           - Economic sensitivity
-        
-        4. OVERALL RISK RATING:
-           - Overall risk level (Low/Medium/High)
-           - Key risk factors
-           - Mitigating factors
-           - Recommended lending terms
-        
-        5. MONITORING RECOMMENDATIONS:
-           - Key metrics to track
-           - Warning signs to watch
-           - Review frequency
-        
-        Format as a professional lending assessment report.
+        prompt, prompt_tokens = _research_prompt("comprehensive", company_name, industry)
+        return await self._cached_completion(prompt, "comprehensive", company_name, on_delta, prompt_tokens)
+    
+    async def comprehensive_risk_assessment_batch(self, companies, batch_size=BATCH_SIZE):
+        """Assess many companies, batch_size per request, returning {company: assessment dict}"""
+        batches = [companies[i:i + batch_size] for i in range(0, len(companies), batch_size)]
+        results = {}
+        for assessments in await asyncio.gather(*[self._assess_batch(batch) for batch in batches]):
+            results.update(assessments)
+        return results
+    
+    async def _assess_batch(self, companies):
+        """Assess a few companies in a single JSON-mode request"""
+        listing = "\n".join(f"{i}) {company}" for i, company in enumerate(companies, 1))
+        prompt = BATCH_RISK_PROMPT.format(listing=listing)
+        
+        messages = [{"role": "user", "content": prompt}]
+        cache_key = self.llm_cache.cache_key(MODEL, messages, TEMPERATURE)
+        assessments = self.llm_cache.get(cache_key)
+        if assessments is None:
+            try:
+                response = await self._call_llm(
+                    messages,
+                    max_tokens=MAX_OUTPUT_TOKENS["comprehensive"] * len(companies),
+                    response_format={"type": "json_object"}
+                )
+                if response.choices[0].finish_reason == "length":
+                    raise TruncatedOutputError("assessments were cut off at the output cap")
+                assessments = json.loads(response.choices[0].message.content)
+            except (APIError, ValueError) as e:
+                # Retries are exhausted or the reply was not valid JSON; keep the other batches
+                return {company: {"error": f"Error in risk assessment: {e}"} for company in companies}
+            self.llm_cache.put(cache_key, assessments)
+        
+        return {
+            company: assessments.get(company, {"error": "Company missing from response"})
+            for company in companies
+        }
+    
+    async def research_all(self, company_name, industry=None, max_concurrent=4):
+        """Run all four research types concurrently, returning {research_type: results}"""
+        semaphore = asyncio.Semaphore(max_concurrent)
+        
+        async def limited(coro):
+            async with semaphore:
+                return await coro
+        
+        results = await asyncio.gather(
+            *[limited(research(self, company_name, industry)) for research in DISPATCH.values()],
+            return_exceptions=True
+        )
+        return dict(zip(DISPATCH, results))
+    
+    async def submit_batch(self, companies, research_types=None, industry=None):
+        """Submit research for many companies as one OpenAI batch job (about half the cost, no
+        per-minute limits, results within 24h), returning the batch id for collect_batch()"""
+        runner = OpenAIBatchRunner(client=self.client, model=MODEL)
+        requests = []
+        for company in companies:
+            for research_type in research_types or DISPATCH:
+                prompt, _ = _research_prompt(research_type, company, industry)
+                requests.append(runner.build_request(
+                    f"{company}:{research_type}",
+                    prompt,
+                    temperature=TEMPERATURE,
+                    max_tokens=MAX_OUTPUT_TOKENS[research_type],
+                    response_format=_response_format(research_type)
+                ))
+        return await runner.submit(requests)
+    
+    async def collect_batch(self, batch_id, poll_interval=30):
+        """Wait for a batch from submit_batch() and save a report per successful company and research
+        type, returning {(company, research_type): results}; failed items map to {"error": ...}"""
+        runner = OpenAIBatchRunner(client=self.client, model=MODEL, poll_interval=poll_interval)
+        results = {}
+        errors = {}
+        for custom_id, content in (await runner.collect(batch_id)).items():
+            key = tuple(custom_id.rsplit(":", 1))
+            if isinstance(content, dict):
+                errors[key] = content["error"]
+                continue
+            try:
+                results[key] = json.loads(content)
+            except ValueError as e:
+                # Usually a reply cut off at its output cap
+                errors[key] = f"Invalid JSON in batch reply: {e}"
+        
+        for (company, research_type), error in errors.items():
+            print(f"✗ {research_type} research for {company} failed: {error}")
+        await asyncio.gather(*[
+            self.save_results_async(research, company, research_type)
+            for (company, research_type), research in results.items()
+        ])
+        
+        results.update((key, {"error": error}) for key, error in errors.items())
+        return results
+    
+    def report_filename(self, company_name, research_type, now=None):
+        """Timestamped JSON report path for a company and research type"""
+        now = now or datetime.now()
+        return f"lending_research_{company_name.replace(' ', '_')}_{research_type}_{now:%Y%m%d_%H%M%S}.json"
+    
+    def open_report(self, company_name, research_type):
+        """Create a report file for streaming, returning (file, filename)
+        
+        The report's fields are written up front; the caller writes the results
+        object and then REPORT_END to complete the JSON document.
         """
+        # One timestamp so the filename and the report date always agree
+        now = datetime.now()
+        filename = self.report_filename(company_name, research_type, now)
+        f = open(filename, "w", buffering=1 << 16)
+        f.write("".join([
+            "{\n",
+            f'  "company": {json.dumps(company_name)},\n',
+            f'  "research_type": {json.dumps(research_type)},\n',
+            f'  "date": "{now:%Y-%m-%d %H:%M:%S}",\n',
+            '  "results": '
+        ]))
+        return f, filename
+    
+    def _report(self, results, company_name, research_type, filename=None):
+        """Return the filename and JSON bytes of a research report"""
+        now = datetime.now()
+        filename = filename or self.report_filename(company_name, research_type, now)
+        report = {
+            "company": company_name,
+            "research_type": research_type,
+            "date": f"{now:%Y-%m-%d %H:%M:%S}",
+            "results": results
+        }
+        return filename, json.dumps(report, indent=2).encode()
+    
+    def save_results(self, results, company_name, research_type, filename=None):
+        """Save research results to a JSON file"""
+        filename, data = self._report(results, company_name, research_type, filename)
+        _write_file(filename, data)
         
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",  # Using cheaper model
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            return f"Error in risk assessment: {e}"
-    
-    def save_results(self, results, company_name, research_type):
-        """Save research results to file"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"lending_research_{company_name.replace(' ', '_')}_{research_type}_{timestamp}.txt"
-        
-        with open(filename, "w") as f:
-            f.write(f"Lending Research Report\n")
-            f.write(f"Company: {company_name}\n")
-            f.write(f"Research Type: {research_type}\n")
-            f.write(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("=" * 50 + "\n\n")
-            f.write(results)
+        print(f"Results saved to: {filename}")
+        return filename
+    
+    async def save_results_async(self, results, company_name, research_type, filename=None):
+        """Save research results to a JSON file from a worker thread, so concurrent research isn't blocked"""
+        filename, data = self._report(results, company_name, research_type, filename)
+        await asyncio.get_running_loop().run_in_executor(None, _write_file, filename, data)
         
         print(f"Results saved to: {filename}")
         return filename
 
-def main():
+def parse_args(argv=None):
+    """Parse the command line options"""
+    parser = argparse.ArgumentParser(description="Simple AI Lending Research Agent")
+    parser.add_argument("--company", default="Apple Inc", help="Company to research")
+    parser.add_argument("--type", dest="research_type", default="comprehensive",
+                        choices=list(DISPATCH) + ["all"], help="Research type to run")
+    parser.add_argument("--industry", default="technology", help="Industry for industry and comprehensive research")
+    return parser.parse_args(argv)
+
+async def main(argv=None):
     """Main function to run lending research"""
-    
-    # Configuration
-    COMPANY_NAME = "Apple Inc"  # Change this to your target company
-    RESEARCH_TYPE = "comprehensive"  # Options: financials, news, industry, comprehensive
+    args = parse_args(argv)
+    company_name = args.company
+    research_type = args.research_type
     
     print("Simple AI Lending Research Agent")
     print("=" * 40)
-    print(f"Researching: {COMPANY_NAME}")
-    print(f"Research Type: {RESEARCH_TYPE}")
+    print(f"Researching: {company_name}")
+    print(f"Research Type: {research_type}")
     print("=" * 40)
     
     try:
         # Initialize agent
         agent = SimpleLendingResearchAgent()
+    except ValueError as e:
+        print(f"Configuration Error: {e}")
+        print("Please set your OpenAI API key in the .env file")
+        return
+    
+    try:
+        if research_type == "all":
+            print("Running all research types concurrently...")
+            all_results = await agent.research_all(company_name, args.industry)
+            
+            for research_type, results in all_results.items():
+                # Display results
+                print("\n" + "=" * 50)
+                print(f"RESEARCH RESULTS ({research_type}):")
+                print("=" * 50)
+                if isinstance(results, Exception):
+                    print(f"Error in {research_type} research: {results}")
+                else:
+                    print(json.dumps(results, indent=2))
+            
+            # Save the successful results, writing the reports concurrently
+            await asyncio.gather(*[
+                agent.save_results_async(results, company_name, research_type)
+                for research_type, results in all_results.items()
+                if not isinstance(results, Exception)
+            ])
+            return
         
-        # Run research based on type
-        if RESEARCH_TYPE == "financials":
-            print("Researching company financials...")
-            results = agent.research_company_financials(COMPANY_NAME)
-        elif RESEARCH_TYPE == "news":
-            print("Researching news and sentiment...")
-            results = agent.research_news_sentiment(COMPANY_NAME)
-        elif RESEARCH_TYPE == "industry":
-            industry = "technology"  # Default, you can change this
-            print(f"Researching industry overview for {industry}...")
-            results = agent.research_industry_overview(industry)
-        elif RESEARCH_TYPE == "comprehensive":
-            print("Conducting comprehensive risk assessment...")
-            results = agent.comprehensive_risk_assessment(COMPANY_NAME)
-        else:
-            print("Unknown research type. Using comprehensive assessment...")
-            results = agent.comprehensive_risk_assessment(COMPANY_NAME)
+        print(f"Running {research_type} research...")
+        research = DISPATCH[research_type]
         
-        # Display results
+        # Stream the results to the screen and the report file as they are generated
         print("\n" + "=" * 50)
         print("RESEARCH RESULTS:")
         print("=" * 50)
-        print(results)
+        report, filename = agent.open_report(company_name, research_type)
+        try:
+            with report:
+                def write_chunk(text):
+                    report.write(text)
+                    print(text, end="", flush=True)
+                
+                await research(agent, company_name, args.industry, on_delta=write_chunk)
+                report.write(REPORT_END)
+        except BaseException:
+            # Don't leave an incomplete report behind
+            os.remove(filename)
+            raise
         
-        # Save results
-        agent.save_results(results, COMPANY_NAME, RESEARCH_TYPE)
+        print(f"\n\nResults saved to: {filename}")
         
-    except ValueError as e:
-        print(f"Configuration Error: {e}")
-        print("Please set your OpenAI API key in the .env file")
     except Exception as e:
-        print(f"Error: {e}")
+        print(f"\nError: {e}")
         print("Please check your internet connection and API key")
+    finally:
+        await agent.aclose()
+        await SimpleLendingResearchAgent.aclose_clients()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    asyncio.run(main()) 
\ No newline at end of file
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test script for the monitoring agent's semantic cache
+
+Checks offline (no OpenAI or Firecrawl calls) that cached analyses are never
+shared between companies, even when their pages are identical.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+
+# Placeholder keys so the agent can be constructed; nothing is sent
+os.environ.setdefault("FIRECRAWL_API_KEY", "fc-test")
+
+from llm_cache import LLMCache
+from monitoring_agent import BUNDLE_SECTIONS, CompanyMonitoringAgent
+
+# The same "no results" page a search site returns for any company
+PAGE = "No results found for your search. Try different keywords or check your spelling. " * 5
+
+class FakeOpenAI:
+    """Stands in for AsyncOpenAI: every text embeds to the same vector, completions are counted"""
+
+    def __init__(self):
+        self.completions = 0
+        self.embeddings = SimpleNamespace(create=self._embed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+
+    async def _embed(self, model, input):
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[1.0] * 8) for _ in input])
+
+    async def _complete(self, messages, response_format, **kwargs):
+        self.completions += 1
+        schema = response_format["json_schema"]["schema"]
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(
+            content=json.dumps(_fill(schema, f"call {self.completions}"))
+        ))])
+
+def _fill(schema, text):
+    """Build a value matching a JSON schema"""
+    if schema["type"] == "object":
+        return {key: _fill(value, text) for key, value in schema["properties"].items()}
+    if schema["type"] == "array":
+        return [text]
+    return schema["enum"][0] if "enum" in schema else text
+
+def _run_in_tempdir(test):
+    """Run an async test against a fresh agent, with its cache files in a temporary directory"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        agent = CompanyMonitoringAgent(openai_api_key="sk-test")
+        agent.openai_client = FakeOpenAI()
+        # Exact-match caching off, so only the semantic cache can answer
+        agent.llm_cache = LLMCache(max_temperature=-1)
+        try:
+            return asyncio.run(test(agent))
+        finally:
+            asyncio.run(agent.aclose())
+            os.chdir(cwd)
+
+def test_content_analysis_not_shared_between_companies():
+    """Identical pages for two companies each get their own analysis"""
+    async def test(agent):
+        apple = await agent.analyze_content_with_ai(PAGE, "news", "Apple Inc")
+        microsoft = await agent.analyze_content_with_ai(PAGE, "news", "Microsoft Corp")
+        apple_again = await agent.analyze_content_with_ai(PAGE, "news", "Apple Inc")
+
+        assert agent.openai_client.completions == 2
+        assert microsoft != apple
+        assert apple_again == apple
+
+    _run_in_tempdir(test)
+
+def test_section_analysis_not_shared_between_companies():
+    """Identical bundled sections for two companies each get their own analysis"""
+    async def test(agent):
+        sections = {name: PAGE for name in BUNDLE_SECTIONS}
+        apple = await agent.analyze_sections(sections, "Apple Inc")
+        microsoft = await agent.analyze_sections(sections, "Microsoft Corp")
+        apple_again = await agent.analyze_sections(sections, "Apple Inc")
+
+        assert agent.openai_client.completions == 2
+        assert set(apple) == set(BUNDLE_SECTIONS)
+        assert microsoft != apple
+        assert apple_again == apple
+
+    _run_in_tempdir(test)
+
+def test_failed_bundle_reported_per_section():
+    """A failed bundled completion is reported as an error on every section it covered"""
+    async def test(agent):
+        async def fail(**kwargs):
+            raise RuntimeError("service unavailable")
+        agent.openai_client.chat.completions.create = fail
+
+        analyses = await agent.analyze_sections({name: PAGE for name in BUNDLE_SECTIONS}, "Apple Inc")
+
+        assert set(analyses) == set(BUNDLE_SECTIONS)
+        assert all("service unavailable" in analysis["error"] for analysis in analyses.values())
+
+    _run_in_tempdir(test)
+
+def main():
+    """Main test function"""
+    print("Monitoring Agent - Semantic Cache Test")
+    print("=" * 40)
+
+    all_tests_passed = True
+    for test in (
+        test_content_analysis_not_shared_between_companies,
+        test_section_analysis_not_shared_between_companies,
+        test_failed_bundle_reported_per_section
+    ):
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+        except AssertionError:
+            print(f"❌ {test.__doc__}")
+            all_tests_passed = False
+
+    print("\n" + "=" * 40)
+    print("🎉 All tests passed!" if all_tests_passed else "❌ Some tests failed.")
+
+if __name__ == "__main__":
+    main()
@@ -7,59 +7,65 @@ This script tests the basic setup and compatibility of the lending research agen
 
 import sys
 import os
+import importlib
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 
-def test_imports():
-    """Test if all required modules can be imported"""
-    print("Testing imports...")
-    
-    try:
-        import langchain_openai
-        print("✅ langchain_openai imported successfully")
-    except ImportError as e:
-        print(f"❌ langchain_openai import failed: {e}")
+def _has_symbol(module_name, symbol):
+    """Check that a module is installed and defines symbol, without instantiating anything"""
+    if importlib.util.find_spec(module_name) is None:
         return False
-    
-    try:
-        import browser_use
-        print("✅ browser_use imported successfully")
-    except ImportError as e:
-        print(f"❌ browser_use import failed: {e}")
-        return False
-    
+    return hasattr(importlib.import_module(module_name), symbol)
+
+# Modules probed by test_imports: (module, package name shown to the user)
+REQUIRED_MODULES = (
+    ("langchain_openai", "langchain_openai"),
+    ("browser_use", "browser_use"),
+    ("pandas", "pandas"),
+    ("requests", "requests"),
+    ("dotenv", "python-dotenv")
+)
+
+def _try_import(module_name):
+    """Import a module, returning the ImportError or None on success"""
     try:
-        import pandas
-        print("✅ pandas imported successfully")
+        importlib.import_module(module_name)
+        return None
     except ImportError as e:
-        print(f"❌ pandas import failed: {e}")
-        return False
+        return e
+
+def test_imports():
+    """Test if all required modules can be imported"""
+    print("Testing imports...")
     
-    try:
-        import requests
-        print("✅ requests imported successfully")
-    except ImportError as e:
-        print(f"❌ requests import failed: {e}")
-        return False
+    # Cold imports of browser_use and pandas are slow; overlap them in threads
+    with ThreadPoolExecutor(max_workers=len(REQUIRED_MODULES)) as executor:
+        errors = list(executor.map(_try_import, [module for module, _ in REQUIRED_MODULES]))
     
-    try:
-        from dotenv import load_dotenv
-        print("✅ python-dotenv imported successfully")
-    except ImportError as e:
-        print(f"❌ python-dotenv import failed: {e}")
-        return False
+    # Report in a fixed order regardless of which import finished first
+    all_imported = True
+    for (_, name), error in zip(REQUIRED_MODULES, errors):
+        if error is None:
+            print(f"✅ {name} imported successfully")
+        else:
+            print(f"❌ {name} import failed: {error}")
+            all_imported = False
     
-    return True
+    return all_imported
 
 def test_langchain_setup():
     """Test LangChain setup"""
     print("\nTesting LangChain setup...")
     
+    # Only check the class is there; constructing it can validate credentials over the network
     try:
-        from langchain_openai import ChatOpenAI
-        llm = ChatOpenAI(model="gpt-4o")
-        print("✅ ChatOpenAI created successfully")
-        return True
+        if _has_symbol("langchain_openai", "ChatOpenAI"):
+            print("✅ ChatOpenAI is available")
+            return True
+        print("❌ langchain_openai.ChatOpenAI is not available")
+        return False
     except Exception as e:
-        print(f"❌ ChatOpenAI creation failed: {e}")
+        print(f"❌ ChatOpenAI check failed: {e}")
         return False
 
 def test_browser_use_setup():
@@ -111,22 +117,17 @@ def test_env_setup():
         return False
 
 def test_simple_agent_creation():
-    """Test simple agent creation"""
-    print("\nTesting simple agent creation...")
+    """Test the agent classes are available (offline, nothing is instantiated)"""
+    print("\nTesting agent availability...")
     
     try:
-        from langchain_openai import ChatOpenAI
-        from browser_use import Agent
-        
-        llm = ChatOpenAI(model="gpt-4o")
-        agent = Agent(
-            task="Test task",
-            llm=llm
-        )
-        print("✅ Agent created successfully")
-        return True
+        if _has_symbol("langchain_openai", "ChatOpenAI") and _has_symbol("browser_use", "Agent"):
+            print("✅ Agent classes are available")
+            return True
+        print("❌ langchain_openai.ChatOpenAI or browser_use.Agent is not available")
+        return False
     except Exception as e:
-        print(f"❌ Agent creation failed: {e}")
+        print(f"❌ Agent check failed: {e}")
         print(f"Error type: {type(e).__name__}")
         return False
 